@@ -2,7 +2,7 @@
 Application configuration
 """
 import os
-from functools import lru_cache
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 
@@ -16,6 +16,12 @@ class Settings(BaseSettings):
     # Projects base directory
     projects_base_dir: str = os.path.join(os.getcwd(), "projects")
 
+    # Worker threads for sync route handlers (Starlette's default is 40)
+    threadpool_size: int = 200
+
+    # Calibration/stacking runs allowed at once (each holds a frame stack in memory)
+    max_concurrent_stacks: int = 2
+
     # Logging
     log_level: str = "INFO"
 
@@ -24,7 +30,12 @@ class Settings(BaseSettings):
         case_sensitive = False
 
 
-@lru_cache()
+_settings: Optional[Settings] = None
+
+
 def get_settings() -> Settings:
     """Get cached settings instance"""
-    return Settings()
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
@@ -2,9 +2,12 @@
 Astroalex Backend - FastAPI Server
 Main entry point for the astrophotography processing pipeline API
 """
+from contextlib import asynccontextmanager
+import asyncio
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import logging
 
 from app.routers import (
@@ -18,6 +21,10 @@ from app.routers import (
     visualization_router,
 )
 from app.config import get_settings
+from app.warmup import warmup_validators
+from app.utils.process_pool import shutdown_process_pool
+from app.utils.http import close_http_client
+from app.routers.session import sweep_upload_dirs_periodically
 
 # Configure logging
 settings = get_settings()
@@ -27,11 +34,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown"""
+    # Blocking handlers (pipelines, projects) run in this pool, so its size
+    # caps how many can overlap
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    warmup_validators()
+    upload_sweeper = asyncio.create_task(sweep_upload_dirs_periodically())
+    yield
+    upload_sweeper.cancel()
+    shutdown_process_pool()
+    close_http_client()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Astroalex API",
     description="Astrophotography Processing Pipeline Backend",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
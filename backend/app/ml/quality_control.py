@@ -1,14 +1,108 @@
 """
 Machine Learning Quality Control using Isolation Forest
 """
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Iterator
 import numpy as np
 from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
 from astropy.io import fits
-from astropy.stats import sigma_clipped_stats
-from photutils.detection import DAOStarFinder
+import sep
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever _extract_features changes so cached features are recomputed
+FEATURES_CACHE_VERSION = 2
+
+# Frames taller than this are decimated before star detection. QC only needs
+# population statistics (median FWHM, star density), not astrometry
+DOWNSAMPLE_THRESHOLD = 2048
+DOWNSAMPLE_FACTOR = 2
+
+# Per-frame features stored column-wise; all fields are float32 so the array
+# can be viewed as an (N, 5) model matrix without copying
+FEATURE_DTYPE = np.dtype([
+    ('fwhm', 'f4'),
+    ('eccentricity', 'f4'),
+    ('background', 'f4'),
+    ('star_count', 'f4'),
+    ('background_std', 'f4'),
+])
+
+# Indexed by the codes produced in QualityControl._categorize_rejections
+REJECTION_REASONS = (
+    "Poor seeing (high FWHM)",
+    "Tracking error (elongated stars)",
+    "High background (clouds/light pollution)",
+    "Low star count (clouds/transparency)",
+    "Anomalous (multiple factors)",
+)
+
+
+def _reason_codes(
+    fwhm: np.ndarray,
+    eccentricity: np.ndarray,
+    background: np.ndarray,
+    star_count: np.ndarray,
+    median_fwhm: float,
+    median_bg: float,
+    median_stars: float
+) -> np.ndarray:
+    """
+    Map rejected-frame features to REJECTION_REASONS indices
+
+    The first matching condition wins, mirroring an if/elif chain.
+    """
+    return np.select(
+        [
+            fwhm > median_fwhm * 1.5,
+            eccentricity > 0.3,
+            background > median_bg * 1.3,
+            star_count < median_stars * 0.6,
+        ],
+        [0, 1, 2, 3],
+        default=4
+    )
+
+
+def _init_worker() -> None:
+    """
+    Process-pool initializer: one native thread per worker
+
+    Parallelism comes from the pool itself; letting OpenMP/BLAS in each
+    worker spawn a thread per core as well would oversubscribe the CPU.
+    """
+    os.environ["OMP_NUM_THREADS"] = "1"
+    threadpool_limits(limits=1)
+    # Per-frame astropy header/unit chatter only adds contention on stderr
+    logging.getLogger("astropy").setLevel(logging.WARNING)
+
+
+def _pool_context():
+    """Prefer forkserver (Linux): cheap forks without inheriting parent state"""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context()
+
+
+def _extract_features_worker(frame_path: str) -> Optional[Dict]:
+    """
+    Process-pool entry point for feature extraction
+
+    Lives at module level so it can be pickled by ProcessPoolExecutor.
+    Returns None instead of raising so one bad frame doesn't abort the batch.
+    """
+    try:
+        return QualityControl._extract_features(frame_path)
+    except Exception as e:
+        logger.warning(f"Error processing {frame_path}: {e}")
+        return None
 
 
 class QualityControl:
@@ -22,13 +116,21 @@ class QualityControl:
     - Star count (clouds, transparency)
     """
 
-    def __init__(self, contamination: float = 0.1):
+    def __init__(
+        self,
+        contamination: float = 0.1,
+        max_workers: Optional[int] = None,
+        cache_dir: Optional[str] = "./data/cache"
+    ):
         """
         Args:
             contamination: Expected fraction of outliers (default 10%)
+            max_workers: Workers for feature extraction and model training (default: CPU count)
+            cache_dir: Directory for the per-frame features cache (None disables it)
         """
         self.contamination = contamination
-        self.scaler = StandardScaler()
+        self.max_workers = max_workers or os.cpu_count()
+        self.cache_file = Path(cache_dir) / "qc_features.json" if cache_dir else None
         self.model = None
 
     def analyze_session(self, frame_paths: List[str]) -> Dict:
@@ -41,112 +143,178 @@ class QualityControl:
         Returns:
             Dict with analysis results and rejection recommendations
         """
-        # Extract features from all frames
-        features_list = []
-        frame_info = []
-
-        for frame_path in frame_paths:
-            try:
-                features = self._extract_features(frame_path)
-                features_list.append(features)
-                frame_info.append({
-                    'path': frame_path,
-                    'features': features
-                })
-            except Exception as e:
-                print(f"Error processing {frame_path}: {e}")
+        # Reuse cached features for frames unchanged since the last run
+        cache = self._load_cache()
+        keys = [self._cache_key(frame_path) for frame_path in frame_paths]
+        results = [cache.get(key) if key else None for key in keys]
+        missing = [i for i, features in enumerate(results) if features is None]
+
+        # Extract features for the remaining frames in parallel (map preserves order)
+        if missing:
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=_pool_context(),
+                initializer=_init_worker
+            ) as executor:
+                extracted = executor.map(
+                    _extract_features_worker,
+                    [frame_paths[i] for i in missing],
+                    chunksize=4
+                )
+                for i, features in zip(missing, extracted):
+                    results[i] = features
+                    if features is not None and keys[i]:
+                        cache[keys[i]] = features
+
+            self._save_cache(cache)
+
+        # Store features once as a structured array (one row per valid frame)
+        # and view it as the model matrix
+        paths = []
+        rows = []
+
+        for frame_path, frame_features in zip(frame_paths, results):
+            if frame_features is None:
                 continue
+            paths.append(frame_path)
+            rows.append(tuple(frame_features[name] for name in FEATURE_DTYPE.names))
 
-        if len(features_list) < 10:
+        if len(rows) < 10:
             return {
                 'error': 'Not enough frames for analysis (minimum 10 required)',
-                'frame_count': len(features_list)
+                'frame_count': len(rows)
             }
 
-        # Convert to numpy array
-        X = np.array([[
-            f['fwhm'],
-            f['eccentricity'],
-            f['background'],
-            f['star_count'],
-            f['background_std']
-        ] for f in features_list])
-
-        # Normalize features
-        X_scaled = self.scaler.fit_transform(X)
+        features = np.array(rows, dtype=FEATURE_DTYPE)
+        X = features.view(np.float32).reshape(len(features), len(FEATURE_DTYPE.names))
 
-        # Train Isolation Forest
+        # Train Isolation Forest (trees are built in parallel across cores).
+        # No feature scaling: each split picks a threshold uniformly within one
+        # feature's [min, max] range, so the model is invariant to per-feature
+        # affine transforms (Liu et al., 2008) and float32 is its native dtype
+        # Subsamples of 256 are near-optimal and path lengths converge with far
+        # fewer trees on 5 low-dimensional features than the 100 default
         self.model = IsolationForest(
             contamination=self.contamination,
             random_state=42,
-            n_estimators=100
+            n_estimators=32,
+            max_samples=min(256, len(X)),
+            n_jobs=self.max_workers
         )
-        predictions = self.model.fit_predict(X_scaled)
+        predictions = self.model.fit_predict(X)
 
         # Analyze results
-        rejected_indices = np.where(predictions == -1)[0]
-        accepted_indices = np.where(predictions == 1)[0]
+        rejected_mask = predictions == -1
+        rejected_indices = np.nonzero(rejected_mask)[0]
+        accepted_indices = np.nonzero(~rejected_mask)[0]
 
         # Categorize rejections
-        rejection_reasons = self._categorize_rejections(
-            features_list,
+        reason_codes = self._categorize_rejections(
+            features,
             rejected_indices
         )
 
-        # Build report
+        # Build report. Rejected frames are (index, reason code) pairs into
+        # frame_paths/features; use get_rejected() to expand them
         report = {
             'total_frames': len(frame_paths),
             'accepted': len(accepted_indices),
             'rejected': len(rejected_indices),
             'rejection_percentage': (len(rejected_indices) / len(frame_paths)) * 100,
-            'rejected_frames': [
-                {
-                    'path': frame_info[i]['path'],
-                    'reason': rejection_reasons[j],
-                    'features': frame_info[i]['features']
-                }
-                for j, i in enumerate(rejected_indices)
-            ],
+            'frame_paths': paths,
+            'features': features,
+            'rejected_frames': list(zip(rejected_indices.tolist(), reason_codes.tolist())),
             'accepted_frames': [
-                frame_info[i]['path'] for i in accepted_indices
+                paths[i] for i in accepted_indices
             ],
-            'statistics': self._calculate_statistics(features_list, accepted_indices)
+            'statistics': self._calculate_statistics(features, accepted_indices)
         }
 
         return report
 
-    def _extract_features(self, frame_path: str) -> Dict:
+    @staticmethod
+    def _cache_key(frame_path: str) -> Optional[str]:
+        """Cache key that changes whenever the file is rewritten"""
+        try:
+            stat = os.stat(frame_path)
+        except OSError:
+            return None
+        return f"{os.path.abspath(frame_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        """Load cached features, discarding entries from older extractors"""
+        if not self.cache_file or not self.cache_file.exists():
+            return {}
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if data.get("version") != FEATURES_CACHE_VERSION:
+            return {}
+        return data.get("features", {})
+
+    def _save_cache(self, cache: Dict[str, Dict]):
+        """Persist cached features to disk"""
+        if not self.cache_file:
+            return
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_file, "w", encoding="utf-8") as f:
+            json.dump({"version": FEATURES_CACHE_VERSION, "features": cache}, f)
+
+    @staticmethod
+    def _extract_features(frame_path: str) -> Dict:
         """
         Extract quality metrics from a frame
 
         Returns:
             Dict with features: fwhm, eccentricity, background, star_count, etc.
         """
-        with fits.open(frame_path) as hdul:
-            data = hdul[0].data.astype(float)
-
-        # Background statistics
-        mean, median, std = sigma_clipped_stats(data, sigma=3.0)
-
-        # Star detection
+        # Astropy memory-maps unscaled HDUs (scaled BZERO/BSCALE images are
+        # decoded in memory). Convert straight into a float32 working copy:
+        # SEP needs C-contiguous native byte order data (FITS is big-endian)
+        # and the background is subtracted from it in place, so this is the
+        # only full-size array held per worker
+        with fits.open(frame_path, mode='readonly') as hdul:
+            raw = hdul[0].data
+            # Decimate large frames before the float32 copy (1/4 of the pixels
+            # to convert and search). Plain slicing keeps per-pixel noise, so
+            # background/RMS stay comparable with full-resolution frames
+            scale = DOWNSAMPLE_FACTOR if raw.shape[0] > DOWNSAMPLE_THRESHOLD else 1
+            if scale > 1:
+                raw = raw[::scale, ::scale]
+            data = np.ascontiguousarray(raw, dtype=np.float32)
+
+        # Background model: global level (median) and RMS in a single C pass
+        bkg = sep.Background(data)
+        median = bkg.globalback
+        std = bkg.globalrms
+
+        # Subtract the background model in place: avoids materializing the
+        # full background map and a second difference array
+        bkg.subfrom(data)
+
+        # Star detection (5 sigma above the background RMS)
         try:
-            daofind = DAOStarFinder(fwhm=3.0, threshold=5.0 * std)
-            sources = daofind(data - median)
+            sources = sep.extract(data, thresh=5.0, err=std)
 
-            if sources is None or len(sources) == 0:
+            if len(sources) == 0:
                 fwhm = 0
                 eccentricity = 0
                 star_count = 0
             else:
-                # FWHM statistics
-                fwhm = np.median(sources['fwhm'])
+                a = sources['a']
+                b = sources['b']
 
-                # Eccentricity (roundness metric)
-                if 'roundness' in sources.colnames:
-                    eccentricity = 1.0 - np.median(sources['roundness'])
-                else:
-                    eccentricity = 0
+                # FWHM from the geometric mean of the semi-axes (Gaussian sigma),
+                # rescaled to full-resolution pixels
+                fwhm = np.median(2.355 * np.sqrt(a * b)) * scale
 
+                # Eccentricity (elongation metric)
+                eccentricity = np.median(1.0 - b / a)
+
+                # On decimated frames this is a proxy (faint stars drop out),
+                # only comparable between frames of the same size
                 star_count = len(sources)
 
         except Exception:
@@ -164,59 +332,57 @@ class QualityControl:
 
     def _categorize_rejections(
         self,
-        features_list: List[Dict],
+        features: np.ndarray,
         rejected_indices: np.ndarray
-    ) -> List[str]:
+    ) -> np.ndarray:
         """
         Categorize why frames were rejected
 
+        Args:
+            features: Structured array of per-frame features (FEATURE_DTYPE)
+            rejected_indices: Indices of rejected frames
+
         Returns:
-            List of rejection reasons
+            Array of REJECTION_REASONS indices, one per rejected frame
         """
-        reasons = []
-
         # Calculate session medians for comparison
-        all_fwhm = [f['fwhm'] for f in features_list if f['fwhm'] > 0]
-        all_bg = [f['background'] for f in features_list]
-        all_stars = [f['star_count'] for f in features_list]
-
-        median_fwhm = np.median(all_fwhm) if all_fwhm else 0
-        median_bg = np.median(all_bg)
-        median_stars = np.median(all_stars)
-
-        for idx in rejected_indices:
-            f = features_list[idx]
-
-            # Determine primary reason
-            if f['fwhm'] > median_fwhm * 1.5:
-                reasons.append("Poor seeing (high FWHM)")
-            elif f['eccentricity'] > 0.3:
-                reasons.append("Tracking error (elongated stars)")
-            elif f['background'] > median_bg * 1.3:
-                reasons.append("High background (clouds/light pollution)")
-            elif f['star_count'] < median_stars * 0.6:
-                reasons.append("Low star count (clouds/transparency)")
-            else:
-                reasons.append("Anomalous (multiple factors)")
+        fwhm = features['fwhm']
+        valid_fwhm = fwhm[fwhm > 0]
+
+        median_fwhm = np.median(valid_fwhm) if valid_fwhm.size else 0
+        median_bg = np.median(features['background'])
+        median_stars = np.median(features['star_count'])
+
+        # Determine primary reason for each rejected frame
+        rejected = features[rejected_indices]
+        codes = _reason_codes(
+            rejected['fwhm'],
+            rejected['eccentricity'],
+            rejected['background'],
+            rejected['star_count'],
+            median_fwhm,
+            median_bg,
+            median_stars
+        )
 
-        return reasons
+        return codes
 
     def _calculate_statistics(
         self,
-        features_list: List[Dict],
+        features: np.ndarray,
         accepted_indices: np.ndarray
     ) -> Dict:
         """Calculate statistics for accepted frames"""
-        accepted_features = [features_list[i] for i in accepted_indices]
-
-        fwhm_values = [f['fwhm'] for f in accepted_features if f['fwhm'] > 0]
-        bg_values = [f['background'] for f in accepted_features]
-        star_counts = [f['star_count'] for f in accepted_features]
+        # Gather only the three columns used (contiguous 1-D copies)
+        fwhm_col = features['fwhm'][accepted_indices]
+        fwhm_values = fwhm_col[fwhm_col > 0]
+        bg_values = features['background'][accepted_indices]
+        star_counts = features['star_count'][accepted_indices]
 
         return {
             'fwhm': {
-                'median': float(np.median(fwhm_values)) if fwhm_values else 0,
-                'std': float(np.std(fwhm_values)) if fwhm_values else 0
+                'median': float(np.median(fwhm_values)) if fwhm_values.size else 0,
+                'std': float(np.std(fwhm_values)) if fwhm_values.size else 0
             },
             'background': {
                 'median': float(np.median(bg_values)),
@@ -228,6 +394,33 @@ class QualityControl:
             }
         }
 
+    @staticmethod
+    def get_rejected(report: Dict, start: int = 0, end: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Materialize rejected frame entries on demand
+
+        Args:
+            report: QC report from analyze_session()
+            start: Index of the first rejected frame to yield
+            end: Index after the last rejected frame to yield (None for all)
+
+        Yields:
+            Dict with path, reason and features for each rejected frame
+        """
+        paths = report['frame_paths']
+        features = report['features']
+
+        for index, code in report['rejected_frames'][start:end]:
+            row = features[index]
+            frame_features = {name: float(row[name]) for name in FEATURE_DTYPE.names}
+            frame_features['star_count'] = int(frame_features['star_count'])
+
+            yield {
+                'path': paths[index],
+                'reason': REJECTION_REASONS[code],
+                'features': frame_features
+            }
+
     def move_rejected_frames(self, report: Dict, rejected_dir: Path):
         """
         Move rejected frames to a separate directory
@@ -236,13 +429,25 @@ class QualityControl:
             report: QC report from analyze_session()
             rejected_dir: Directory to move rejected frames to
         """
-        import shutil
-
         rejected_dir.mkdir(parents=True, exist_ok=True)
+        rejected_dev = os.stat(rejected_dir).st_dev
 
-        for item in report['rejected_frames']:
+        def move(item: Dict) -> Optional[str]:
             source = Path(item['path'])
-            if source.exists():
-                dest = rejected_dir / source.name
+            if not source.exists():
+                return None
+
+            dest = rejected_dir / source.name
+            # Same filesystem: a single rename syscall, no data copy
+            if source.stat().st_dev == rejected_dev:
+                os.rename(source, dest)
+            else:
                 shutil.move(str(source), str(dest))
-                print(f"Moved {source.name} -> {rejected_dir} (Reason: {item['reason']})")
+            return f"{source.name} ({item['reason']})"
+
+        # Moves are latency-bound, so overlap them on a small thread pool
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            moved = [name for name in executor.map(move, self.get_rejected(report)) if name]
+
+        logger.info(f"Moved {len(moved)} rejected frames to {rejected_dir}")
+        logger.debug(f"Moved frames: {', '.join(moved)}")
@@ -3,13 +3,17 @@ Configuration Models
 Storage configuration and user state management
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import ClassVar, Dict, Optional, Tuple
 from pathlib import Path
 from .common import GeoLocation
 
 
 class StorageConfig(BaseModel):
     """Storage paths configuration"""
+    PATH_FIELDS: ClassVar[Tuple[str, ...]] = (
+        "raw_data_path", "processed_data_path", "projects_path", "cache_path"
+    )
+
     raw_data_path: str = Field(
         ...,
         description="Path for raw FITS files (can be external drive)"
@@ -27,17 +31,23 @@ class StorageConfig(BaseModel):
         description="Path for temporary cache files"
     )
 
+    def paths(self) -> Dict[str, str]:
+        """Configured paths by field name"""
+        return {field_name: getattr(self, field_name) for field_name in self.PATH_FIELDS}
+
+    @staticmethod
+    def validate_path(path: str) -> dict:
+        """Validate that a path exists or can be created"""
+        path = Path(path)
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+            return {"valid": True, "exists": path.exists()}
+        except Exception as e:
+            return {"valid": False, "error": str(e)}
+
     def validate_paths(self) -> dict:
         """Validate that all paths exist or can be created"""
-        results = {}
-        for field_name in ["raw_data_path", "processed_data_path", "projects_path", "cache_path"]:
-            path = Path(getattr(self, field_name))
-            try:
-                path.mkdir(parents=True, exist_ok=True)
-                results[field_name] = {"valid": True, "exists": path.exists()}
-            except Exception as e:
-                results[field_name] = {"valid": False, "error": str(e)}
-        return results
+        return {field_name: self.validate_path(path) for field_name, path in self.paths().items()}
 
 
 class UserState(BaseModel):
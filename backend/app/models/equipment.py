@@ -2,11 +2,15 @@
 Equipment Profile Models
 Models for camera, telescope, mount, filters and complete equipment profiles
 """
+import math
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from .common import GeoLocation
 
+# Arcseconds per radian (~206265)
+ARCSEC_PER_RADIAN = 3600 * 180 / math.pi
+
 
 class CameraInfo(BaseModel):
     """Camera information and specifications"""
@@ -123,18 +127,19 @@ class EquipmentProfile(BaseModel):
     def fov_width(self) -> float:
         """Calculate FOV width in degrees"""
         sensor_width_mm = self.camera.sensor_width * self.camera.pixel_size / 1000
-        return 2 * (180 / 3.14159) * (sensor_width_mm / (2 * self.telescope.focal_length))
+        return 2 * math.degrees(sensor_width_mm / (2 * self.telescope.focal_length))
 
     @property
     def fov_height(self) -> float:
         """Calculate FOV height in degrees"""
         sensor_height_mm = self.camera.sensor_height * self.camera.pixel_size / 1000
-        return 2 * (180 / 3.14159) * (sensor_height_mm / (2 * self.telescope.focal_length))
+        return 2 * math.degrees(sensor_height_mm / (2 * self.telescope.focal_length))
 
     @property
     def pixel_scale(self) -> float:
         """Calculate pixel scale in arcseconds/pixel"""
-        return 206.265 * self.camera.pixel_size / self.telescope.focal_length
+        # pixel_size in microns, focal_length in mm
+        return ARCSEC_PER_RADIAN * (self.camera.pixel_size / 1000) / self.telescope.focal_length
 
     @property
     def sampling_quality(self) -> str:
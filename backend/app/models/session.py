@@ -2,28 +2,36 @@
 Data models for observing sessions and wizard workflow
 """
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Any
-from pydantic import BaseModel, Field
-from enum import Enum
+from typing import Optional, Dict, List, Any, Literal, get_args
+from pydantic import BaseModel, ConfigDict, Field
 from .common import GeoLocation
 
 
-class SessionStatus(str, Enum):
-    """Status of an observing session"""
-    CREATED = "created"
-    STEP1_CONTEXT = "step1_context"
-    STEP2_CAMERA = "step2_camera"
-    STEP3_TARGET = "step3_target"
-    STEP4_SCOUT = "step4_scout"
-    STEP5_PLAN = "step5_plan"
-    STEP6_INGESTION = "step6_ingestion"
-    STEP7_QUALITY = "step7_quality"
-    STEP8_PROCESSING = "step8_processing"
-    COMPLETED = "completed"
+# Status of an observing session. A Literal validates as a plain string
+# membership check (no Enum instance per session) and is the same on the wire
+SessionStatus = Literal[
+    "created",
+    "step1_context",
+    "step2_camera",
+    "step3_target",
+    "step4_scout",
+    "step5_plan",
+    "step6_ingestion",
+    "step7_quality",
+    "step8_processing",
+    "completed",
+]
+SESSION_STATUSES = get_args(SessionStatus)
+
+# Immutable value objects produced by the wizard services. Core schemas are
+# built on first use instead of at import time
+VALUE_MODEL_CONFIG = ConfigDict(frozen=True, defer_build=True, extra="forbid")
 
 
 class SkyConditions(BaseModel):
     """Current sky conditions from weather APIs"""
+    model_config = VALUE_MODEL_CONFIG
+
     seeing: float = Field(..., description="Seeing in arcseconds")
     clouds: int = Field(..., ge=0, le=100, description="Cloud coverage percentage")
     jet_stream: float = Field(..., description="Jet stream speed in m/s")
@@ -37,6 +45,8 @@ class SkyConditions(BaseModel):
 
 class Ephemeris(BaseModel):
     """Astronomical ephemeris data"""
+    model_config = VALUE_MODEL_CONFIG
+
     darkness_start: datetime = Field(..., description="Start of astronomical darkness")
     darkness_end: datetime = Field(..., description="End of astronomical darkness")
     darkness_duration: float = Field(..., description="Duration of darkness in hours")
@@ -61,6 +71,8 @@ class Ephemeris(BaseModel):
 
 class SensorProfile(BaseModel):
     """Camera sensor characterization profile"""
+    model_config = VALUE_MODEL_CONFIG
+
     camera_model: str = Field(..., description="Camera model name")
     read_noise: float = Field(..., description="Read noise in electrons (e-)")
     gain: float = Field(..., description="Gain in e-/ADU")
@@ -75,6 +87,8 @@ class SensorProfile(BaseModel):
 
 class CelestialTarget(BaseModel):
     """Celestial object target"""
+    model_config = VALUE_MODEL_CONFIG
+
     name: str = Field(..., description="Common name")
     catalog_id: str = Field(..., description="Catalog identifier (NGC, IC, M, etc.)")
     ra: float = Field(..., ge=0, lt=360, description="Right ascension in degrees")
@@ -89,6 +103,8 @@ class CelestialTarget(BaseModel):
 
 class FOVSimulation(BaseModel):
     """Field of view simulation result"""
+    model_config = VALUE_MODEL_CONFIG
+
     target: str
     fits_in_frame: bool
     coverage_percentage: float = Field(..., ge=0, le=100)
@@ -101,6 +117,8 @@ class FOVSimulation(BaseModel):
 
 class ScoutAnalysis(BaseModel):
     """Smart Scout analysis results"""
+    model_config = VALUE_MODEL_CONFIG
+
     sky_background: float = Field(..., description="Sky background in electrons/second")
     saturation_detected: bool
     saturation_percentage: float = Field(..., ge=0, le=100)
@@ -115,6 +133,8 @@ class ScoutAnalysis(BaseModel):
 
 class PlanItem(BaseModel):
     """Single item in acquisition plan"""
+    model_config = VALUE_MODEL_CONFIG
+
     frame_type: str = Field(..., description="Type: light, dark, flat, bias")
     filter_name: Optional[str] = None
     exposure: int = Field(..., description="Exposure time in seconds")
@@ -125,6 +145,8 @@ class PlanItem(BaseModel):
 
 class AcquisitionPlan(BaseModel):
     """Complete acquisition plan for the session"""
+    model_config = VALUE_MODEL_CONFIG
+
     target: CelestialTarget
     lights: Dict[str, PlanItem] = Field(..., description="Light frames by filter")
     darks: List[PlanItem]
@@ -139,6 +161,8 @@ class AcquisitionPlan(BaseModel):
 
 class AssistantMessage(BaseModel):
     """Message from the assistant to the user"""
+    model_config = VALUE_MODEL_CONFIG
+
     step: str
     message: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)
@@ -150,7 +174,7 @@ class ObservingSession(BaseModel):
     id: str = Field(..., description="Unique session ID")
     name: str = Field(..., description="Session name")
     date: datetime = Field(default_factory=datetime.utcnow)
-    status: SessionStatus = Field(default=SessionStatus.CREATED)
+    status: SessionStatus = Field(default="created")
 
     # Equipment profile reference
     equipment_profile_id: Optional[str] = Field(None, description="Reference to equipment profile used")
@@ -211,6 +235,8 @@ class SessionUpdate(BaseModel):
 
 class SessionListItem(BaseModel):
     """Minimal session info for listing"""
+    model_config = VALUE_MODEL_CONFIG
+
     id: str
     name: str
     date: datetime
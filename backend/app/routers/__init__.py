@@ -1,22 +1,33 @@
 """
 API routers for Astroalex backend
+
+Routers are imported lazily (PEP 562) so that importing a single router
+module, e.g. in tests, doesn't pull in every service and its astropy/ccdproc
+dependencies.
 """
-from .projects import router as projects_router
-from .ingestion import router as ingestion_router
-from .calibration import router as calibration_router
-from .pipeline import router as pipeline_router
-from .visualization import router as visualization_router
-from .session import router as session_router
-from .equipment import router as equipment_router
-from .config import router as config_router
+from importlib import import_module
+
+_ROUTER_MODULES = {
+    "session_router": ".session",
+    "equipment_router": ".equipment",
+    "config_router": ".config",
+    "projects_router": ".projects",
+    "ingestion_router": ".ingestion",
+    "calibration_router": ".calibration",
+    "pipeline_router": ".pipeline",
+    "visualization_router": ".visualization",
+}
+
+__all__ = list(_ROUTER_MODULES)
+
+
+def __getattr__(name: str):
+    if name not in _ROUTER_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    router = import_module(_ROUTER_MODULES[name], __name__).router
+    globals()[name] = router
+    return router
+
 
-__all__ = [
-    "session_router",
-    "equipment_router",
-    "config_router",
-    "projects_router",
-    "ingestion_router",
-    "calibration_router",
-    "pipeline_router",
-    "visualization_router",
-]
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,15 +1,20 @@
 """
 Calibration and master frame API endpoints
 """
-from typing import List, Optional, Literal
-from fastapi import APIRouter, HTTPException, Depends, Body
-from pydantic import BaseModel, Field
+import asyncio
+from typing import Any, Dict, Iterator, List, Optional, Literal
+from fastapi import APIRouter, HTTPException, Depends, Body, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
 import logging
+import orjson
 
 from app.models.metadata import CalibrationSession, MasterCalibration
-from app.services.project_service import ProjectService
-from app.services.calibration import MasterCalibrationService
+from app.services.project_service import ProjectService, shared_project_service
+from app.services.calibration import MasterCalibrationService, shared_master_service
 from app.config import get_settings
+from app.utils.body import validate_body, body_schema
+from app.utils.responses import json_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/projects/{project_id}/calibration", tags=["calibration"])
@@ -24,6 +29,9 @@ class SessionCreate(BaseModel):
 
 
 class MasterCreate(BaseModel):
+    # Accept both "filter" (wire name) and "filter_name"
+    model_config = ConfigDict(populate_by_name=True)
+
     session_id: str = Field(..., description="Calibration session ID")
     frame_type: Literal["Bias", "Dark", "Flat"] = Field(..., description="Type of master frame")
     file_paths: List[str] = Field(..., description="Paths to frames to combine")
@@ -38,12 +46,13 @@ class MasterCreate(BaseModel):
     sigma_clip_high_thresh: float = 3.0
     minmax_min: int = 1
     minmax_max: int = 1
+    compress: bool = Field(default=False, description="Write the master losslessly tile-compressed")
 
 
 def get_project_service() -> ProjectService:
     """Dependency to get ProjectService instance"""
     settings = get_settings()
-    return ProjectService(settings.projects_base_dir)
+    return shared_project_service(settings.projects_base_dir)
 
 
 def get_master_service(
@@ -54,7 +63,7 @@ def get_master_service(
     project = project_service.get_project(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    return MasterCalibrationService(project.path)
+    return shared_master_service(project.path)
 
 
 @router.post("/sessions", response_model=CalibrationSession, status_code=201)
@@ -73,7 +82,7 @@ async def create_session(
             telescope=session_data.telescope,
             camera=session_data.camera
         )
-        return session
+        return json_response(CalibrationSession, session, status_code=201)
     except Exception as e:
         logger.error(f"Error creating session: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -89,7 +98,7 @@ async def get_sessions(
     """
     try:
         sessions = service.get_sessions()
-        return sessions
+        return json_response(List[CalibrationSession], sessions)
     except Exception as e:
         logger.error(f"Error getting sessions: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -107,7 +116,32 @@ async def get_session(
     session = service.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    return session
+    return json_response(CalibrationSession, session)
+
+
+def _stream_frames(
+    session_name: str,
+    frame_type: str,
+    first: Optional[Dict[str, Any]],
+    frames: Iterator[Dict[str, Any]]
+) -> Iterator[bytes]:
+    """
+    Encode the scan response incrementally, one frame per chunk
+
+    The status line has already been sent, so an error here is logged and
+    re-raised, aborting the response instead of ending it as valid JSON.
+    """
+    header = orjson.dumps({"session_name": session_name, "frame_type": frame_type})
+    yield header[:-1] + b',"frames":['
+    try:
+        if first is not None:
+            yield orjson.dumps(first, option=orjson.OPT_SERIALIZE_NUMPY)
+            for frame in frames:
+                yield b"," + orjson.dumps(frame, option=orjson.OPT_SERIALIZE_NUMPY)
+    except Exception as e:
+        logger.error(f"Error scanning frames: {e}")
+        raise
+    yield b"]}"
 
 
 @router.get("/sessions/{session_name}/frames/{frame_type}")
@@ -120,20 +154,34 @@ async def scan_frames(
     """
     Scan for calibration frames in a session directory.
 
-    Returns information about each frame including statistics.
+    Returns information about each frame including statistics. Frames are
+    streamed as they are read (in a worker thread), so the response starts
+    immediately and the full list is never held in memory.
     """
+    frames = service.iter_calibration_frames(session_name, frame_type)
     try:
-        frames = service.scan_calibration_frames(session_name, frame_type)
-        return {"session_name": session_name, "frame_type": frame_type, "frames": frames}
+        # Opens the directory and reads the first frame before the response
+        # starts, so failing to scan at all is still reported as a 500
+        first = await asyncio.to_thread(next, frames, None)
     except Exception as e:
         logger.error(f"Error scanning frames: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    return StreamingResponse(
+        _stream_frames(session_name, frame_type, first, frames),
+        media_type="application/json"
+    )
+
 
-@router.post("/masters", response_model=MasterCalibration, status_code=201)
+@router.post(
+    "/masters",
+    response_model=MasterCalibration,
+    status_code=201,
+    openapi_extra=body_schema(MasterCreate)
+)
 async def create_master(
     project_id: str,
-    master_data: MasterCreate,
+    request: Request,
     service: MasterCalibrationService = Depends(get_master_service)
 ):
     """
@@ -141,6 +189,7 @@ async def create_master(
 
     This endpoint performs the actual frame combination using CCDProc.
     """
+    master_data = await validate_body(request, MasterCreate)
     try:
         master = service.create_master(
             session_id=master_data.session_id,
@@ -155,8 +204,9 @@ async def create_master(
             sigma_clip_high_thresh=master_data.sigma_clip_high_thresh,
             minmax_min=master_data.minmax_min,
             minmax_max=master_data.minmax_max,
+            compress=master_data.compress,
         )
-        return master
+        return json_response(MasterCalibration, master, status_code=201)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -177,7 +227,7 @@ async def get_masters(
     """
     try:
         masters = service.get_masters(session_id=session_id)
-        return masters
+        return json_response(List[MasterCalibration], masters)
     except Exception as e:
         logger.error(f"Error getting masters: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -195,7 +245,7 @@ async def get_master(
     master = service.get_master(master_id)
     if not master:
         raise HTTPException(status_code=404, detail="Master not found")
-    return master
+    return json_response(MasterCalibration, master)
 
 
 @router.delete("/masters/{master_id}", status_code=204)
@@ -2,46 +2,52 @@
 Configuration Router
 API endpoints for app configuration and user state management
 """
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Request
 from app.models.config import AppConfig, UserState, StorageConfig
-from app.services.config_service import ConfigService
+from app.services.config_service import ConfigService, get_config_service
+from app.utils.body import validate_body, body_schema
+from app.utils.responses import json_response
 
 router = APIRouter(prefix="/config", tags=["config"])
-config_service = ConfigService()
 
 
 @router.get("/", response_model=AppConfig)
-async def get_config():
+async def get_config(config_service: ConfigService = Depends(get_config_service)):
     """
     Get complete application configuration
 
     Returns user state, storage config, and all settings.
     """
-    return config_service.get_config()
+    return json_response(AppConfig, config_service.get_config())
 
 
 @router.get("/user-state", response_model=UserState)
-async def get_user_state():
+async def get_user_state(config_service: ConfigService = Depends(get_config_service)):
     """
     Get current user state
 
     Returns onboarding status, preferences, and active equipment profile.
     """
-    return config_service.get_user_state()
+    return json_response(UserState, config_service.get_user_state())
 
 
-@router.patch("/user-state", response_model=UserState)
-async def update_user_state(updates: dict):
+@router.patch("/user-state", response_model=UserState, openapi_extra=body_schema(dict))
+async def update_user_state(
+    request: Request,
+    config_service: ConfigService = Depends(get_config_service)
+):
     """
     Update user state
 
     Updates user preferences and onboarding flags.
     """
-    return config_service.update_user_state(**updates)
+    updates = await validate_body(request, dict)
+    return json_response(UserState, config_service.update_user_state(**updates))
 
 
 @router.get("/storage", response_model=StorageConfig)
-async def get_storage_config():
+async def get_storage_config(config_service: ConfigService = Depends(get_config_service)):
     """
     Get storage configuration
 
@@ -50,38 +56,47 @@ async def get_storage_config():
     storage = config_service.get_storage_config()
     if not storage:
         raise HTTPException(status_code=404, detail="Storage not configured")
-    return storage
+    return json_response(StorageConfig, storage)
 
 
-@router.put("/storage", response_model=StorageConfig)
-async def set_storage_config(storage_config: StorageConfig):
+@router.put("/storage", response_model=StorageConfig, openapi_extra=body_schema(StorageConfig))
+async def set_storage_config(
+    request: Request,
+    config_service: ConfigService = Depends(get_config_service)
+):
     """
     Set storage configuration
 
     Configures paths for data storage. Validates that paths exist or can be created.
     """
-    # Validate paths
-    validation_results = storage_config.validate_paths()
-    invalid_paths = [
-        path for path, result in validation_results.items()
-        if not result["valid"]
-    ]
-
-    if invalid_paths:
+    storage_config = await validate_body(request, StorageConfig)
+
+    # Validate paths concurrently off the event loop: on slow or network
+    # storage each mkdir/stat can block for a while
+    paths = storage_config.paths()
+    results = await asyncio.gather(
+        *(asyncio.to_thread(StorageConfig.validate_path, path) for path in paths.values())
+    )
+    validation_results = dict(zip(paths, results))
+
+    if not all(result["valid"] for result in results):
         raise HTTPException(
             status_code=400,
             detail={
                 "message": "Some paths are invalid",
-                "invalid_paths": invalid_paths,
+                "invalid_paths": [
+                    path for path, result in validation_results.items()
+                    if not result["valid"]
+                ],
                 "validation_results": validation_results
             }
         )
 
-    return config_service.set_storage_config(storage_config)
+    return json_response(StorageConfig, config_service.set_storage_config(storage_config))
 
 
 @router.post("/onboarding/complete")
-async def complete_onboarding():
+async def complete_onboarding(config_service: ConfigService = Depends(get_config_service)):
     """
     Mark onboarding as completed
 
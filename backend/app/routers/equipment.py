@@ -2,51 +2,75 @@
 Equipment Profile Router
 API endpoints for equipment profile management
 """
-from fastapi import APIRouter, HTTPException
-from typing import List
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Request
+from typing import Callable, List, Optional
 
 from app.models.equipment import (
     EquipmentProfile,
     EquipmentCreate,
     EquipmentUpdate
 )
-from app.services.equipment_service import EquipmentService
-from app.services.config_service import ConfigService
+from app.services.equipment_service import EquipmentService, get_equipment_service
+from app.services.config_service import ConfigService, get_config_service
+from app.utils.body import validate_body, body_schema
+from app.utils.responses import json_response
 
 router = APIRouter(prefix="/equipment", tags=["equipment"])
-equipment_service = EquipmentService()
-config_service = ConfigService()
+# Serializes the load-modify-save cycles now that they run in worker threads
+_write_lock = asyncio.Lock()
 
 
-@router.post("/profiles/", response_model=EquipmentProfile)
-async def create_profile(profile_data: EquipmentCreate):
+async def _persist(
+    config_service: ConfigService,
+    write: Callable[..., Optional[EquipmentProfile]],
+    *args,
+    activate: bool = True
+) -> Optional[EquipmentProfile]:
+    """
+    Run a profile write and the matching active-profile update off the event loop
+
+    The two writes go to separate files (profiles.json and app_config.json),
+    but the user state needs the id and active flag of the written profile,
+    so they run one after the other in worker threads.
+    """
+    async with _write_lock:
+        profile = await asyncio.to_thread(write, *args)
+        if profile is not None and profile.is_active and activate:
+            await asyncio.to_thread(config_service.set_active_equipment_profile, profile.id)
+    return profile
+
+
+@router.post("/profiles/", response_model=EquipmentProfile, openapi_extra=body_schema(EquipmentCreate))
+async def create_profile(
+    request: Request,
+    equipment_service: EquipmentService = Depends(get_equipment_service),
+    config_service: ConfigService = Depends(get_config_service)
+):
     """
     Create a new equipment profile
 
     Creates a profile with camera, telescope, mount, and filters.
     If this is the first profile, it will be set as active automatically.
     """
-    profile = equipment_service.create_profile(profile_data)
-
-    # Update user state if this is the first profile
-    if profile.is_active:
-        config_service.set_active_equipment_profile(profile.id)
-
-    return profile
+    profile_data = await validate_body(request, EquipmentCreate)
+    # Updates user state too if this is the first profile
+    profile = await _persist(config_service, equipment_service.create_profile, profile_data)
+    return json_response(EquipmentProfile, profile)
 
 
 @router.get("/profiles/", response_model=List[EquipmentProfile])
-async def list_profiles():
+async def list_profiles(equipment_service: EquipmentService = Depends(get_equipment_service)):
     """
     List all equipment profiles
 
     Returns all saved equipment profiles, with active profile marked.
     """
-    return equipment_service.list_profiles()
+    return json_response(List[EquipmentProfile], equipment_service.list_profiles())
 
 
 @router.get("/profiles/active", response_model=EquipmentProfile)
-async def get_active_profile():
+async def get_active_profile(equipment_service: EquipmentService = Depends(get_equipment_service)):
     """
     Get the currently active equipment profile
 
@@ -55,48 +79,57 @@ async def get_active_profile():
     profile = equipment_service.get_active_profile()
     if not profile:
         raise HTTPException(status_code=404, detail="No active equipment profile found")
-    return profile
+    return json_response(EquipmentProfile, profile)
 
 
 @router.get("/profiles/{profile_id}", response_model=EquipmentProfile)
-async def get_profile(profile_id: str):
+async def get_profile(profile_id: str, equipment_service: EquipmentService = Depends(get_equipment_service)):
     """
     Get a specific equipment profile by ID
     """
     profile = equipment_service.get_profile(profile_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Equipment profile not found")
-    return profile
+    return json_response(EquipmentProfile, profile)
 
 
 @router.put("/profiles/{profile_id}", response_model=EquipmentProfile)
-async def update_profile(profile_id: str, update_data: EquipmentUpdate):
+async def update_profile(
+    profile_id: str,
+    update_data: EquipmentUpdate,
+    equipment_service: EquipmentService = Depends(get_equipment_service),
+    config_service: ConfigService = Depends(get_config_service)
+):
     """
     Update an equipment profile
 
     Updates the specified profile. If setting as active, all other profiles
     will be automatically deactivated.
     """
-    profile = equipment_service.update_profile(profile_id, update_data)
+    # Updates user state too if changing active profile
+    profile = await _persist(
+        config_service,
+        equipment_service.update_profile,
+        profile_id,
+        update_data,
+        activate=bool(update_data.is_active)
+    )
     if not profile:
         raise HTTPException(status_code=404, detail="Equipment profile not found")
 
-    # Update user state if changing active profile
-    if update_data.is_active:
-        config_service.set_active_equipment_profile(profile.id)
-
-    return profile
+    return json_response(EquipmentProfile, profile)
 
 
 @router.delete("/profiles/{profile_id}")
-async def delete_profile(profile_id: str):
+async def delete_profile(profile_id: str, equipment_service: EquipmentService = Depends(get_equipment_service)):
     """
     Delete an equipment profile
 
     Deletes the profile. If deleting the active profile and other profiles exist,
     the first remaining profile will be set as active.
     """
-    success = equipment_service.delete_profile(profile_id)
+    async with _write_lock:
+        success = await asyncio.to_thread(equipment_service.delete_profile, profile_id)
     if not success:
         raise HTTPException(status_code=404, detail="Equipment profile not found")
 
@@ -104,15 +137,18 @@ async def delete_profile(profile_id: str):
 
 
 @router.post("/profiles/{profile_id}/activate", response_model=EquipmentProfile)
-async def activate_profile(profile_id: str):
+async def activate_profile(
+    profile_id: str,
+    equipment_service: EquipmentService = Depends(get_equipment_service),
+    config_service: ConfigService = Depends(get_config_service)
+):
     """
     Set a profile as the active one
 
     Convenience endpoint to activate a profile. All other profiles will be deactivated.
     """
-    profile = equipment_service.set_active_profile(profile_id)
+    profile = await _persist(config_service, equipment_service.set_active_profile, profile_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Equipment profile not found")
 
-    config_service.set_active_equipment_profile(profile.id)
-    return profile
+    return json_response(EquipmentProfile, profile)
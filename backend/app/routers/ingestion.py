@@ -3,12 +3,14 @@ File ingestion and organization API endpoints
 """
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
 import logging
 
 from app.models.metadata import FileMetadata
-from app.services.project_service import ProjectService
+from app.services.project_service import ProjectService, shared_project_service
 from app.services.ingestion_service import IngestionService
 from app.config import get_settings
+from app.utils.responses import json_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/projects/{project_id}/ingest", tags=["ingestion"])
@@ -17,7 +19,7 @@ router = APIRouter(prefix="/projects/{project_id}/ingest", tags=["ingestion"])
 def get_project_service() -> ProjectService:
     """Dependency to get ProjectService instance"""
     settings = get_settings()
-    return ProjectService(settings.projects_base_dir)
+    return shared_project_service(settings.projects_base_dir)
 
 
 def get_ingestion_service(
@@ -43,7 +45,7 @@ async def scan_ingest_directory(
     """
     try:
         files = service.scan_ingest_directory()
-        return files
+        return json_response(List[FileMetadata], files)
     except Exception as e:
         logger.error(f"Error scanning ingest directory: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -61,7 +63,7 @@ async def get_ingest_stats(
     """
     try:
         stats = service.get_ingest_stats()
-        return stats
+        return ORJSONResponse(stats)
     except Exception as e:
         logger.error(f"Error getting ingest stats: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -87,7 +89,7 @@ async def organize_files(
     """
     try:
         results = service.organize_all_files(session_name=session_name, copy=copy)
-        return results
+        return ORJSONResponse(results)
     except Exception as e:
         logger.error(f"Error organizing files: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,44 +1,78 @@
 """
 Processing pipeline API endpoints
 """
-from typing import List, Optional, Literal
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, Field
+from typing import List, Optional, Literal, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 import logging
+import threading
+import orjson
 
 from app.models.pipeline import ProcessingPipeline
-from app.services.project_service import ProjectService
-from app.services.processing import PipelineService
+from app.services.project_service import ProjectService, shared_project_service
+from app.services.processing import PipelineService, shared_pipeline_service
 from app.config import get_settings
+from app.utils.responses import json_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/projects/{project_id}/pipeline", tags=["pipeline"])
 
+# Calibration and stacking load whole frame sets into memory; beyond this many
+# concurrent runs, requests wait for a slot instead of exhausting RAM
+_stack_slots = threading.BoundedSemaphore(get_settings().max_concurrent_stacks)
+
+
+# Request models. Unknown keys are rejected rather than silently dropped (a
+# misspelt master path would otherwise skip that calibration step)
+REQUEST_MODEL_CONFIG = ConfigDict(extra="forbid", frozen=True)
+
 
-# Request models
 class PipelineCreate(BaseModel):
+    model_config = REQUEST_MODEL_CONFIG
+
     object_name: str
     filters: List[str]
     panels: Optional[List[str]] = None
 
 
 class CalibrationRequest(BaseModel):
+    model_config = REQUEST_MODEL_CONFIG
+
     science_paths: List[str]
     master_bias_path: Optional[str] = None
     master_dark_path: Optional[str] = None
     master_flat_path: Optional[str] = None
+    roi: Optional[Tuple[int, int, int, int]] = Field(
+        None, description="Region (x0, y0, x1, y1) in pixels to calibrate; whole frame if omitted"
+    )
+
+    @field_validator("roi")
+    @classmethod
+    def check_roi(cls, v):
+        if v is not None:
+            x0, y0, x1, y1 = v
+            if not (0 <= x0 < x1 and 0 <= y0 < y1):
+                raise ValueError("roi must satisfy 0 <= x0 < x1 and 0 <= y0 < y1")
+        return v
 
 
 class QualityAnalysisRequest(BaseModel):
+    model_config = REQUEST_MODEL_CONFIG
+
     file_paths: List[str]
 
 
 class RegistrationRequest(BaseModel):
+    model_config = REQUEST_MODEL_CONFIG
+
     source_paths: List[str]
     reference_path: Optional[str] = None
 
 
 class StackingRequest(BaseModel):
+    model_config = REQUEST_MODEL_CONFIG
+
     file_paths: List[str]
     method: Literal["median", "average", "sum"] = "median"
     rejection: Optional[Literal["sigma_clip", "minmax"]] = "sigma_clip"
@@ -47,7 +81,7 @@ class StackingRequest(BaseModel):
 def get_project_service() -> ProjectService:
     """Dependency to get ProjectService instance"""
     settings = get_settings()
-    return ProjectService(settings.projects_base_dir)
+    return shared_project_service(settings.projects_base_dir)
 
 
 def get_pipeline_service(
@@ -58,11 +92,11 @@ def get_pipeline_service(
     project = project_service.get_project(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    return PipelineService(project.path)
+    return shared_pipeline_service(project.path)
 
 
 @router.post("/", response_model=ProcessingPipeline, status_code=201)
-async def create_pipeline(
+def create_pipeline(
     project_id: str,
     pipeline_data: PipelineCreate,
     service: PipelineService = Depends(get_pipeline_service)
@@ -76,26 +110,30 @@ async def create_pipeline(
         )
         return pipeline
     except Exception as e:
-        logger.error(f"Error creating pipeline: {e}")
+        logger.error("Error creating pipeline: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/", response_model=List[ProcessingPipeline])
-async def get_pipelines(
+def get_pipelines(
     project_id: str,
+    request: Request,
     service: PipelineService = Depends(get_pipeline_service)
 ):
-    """Get all processing pipelines."""
+    """Get all processing pipelines (304 if If-None-Match matches the ETag)."""
     try:
+        etag = service.metadata_etag()
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
         pipelines = service.get_pipelines()
-        return pipelines
+        return json_response(List[ProcessingPipeline], pipelines, headers={"ETag": etag})
     except Exception as e:
-        logger.error(f"Error getting pipelines: {e}")
+        logger.error("Error getting pipelines: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/{pipeline_id}/calibrate")
-async def execute_calibration(
+def execute_calibration(
     project_id: str,
     pipeline_id: str,
     request: CalibrationRequest,
@@ -103,23 +141,25 @@ async def execute_calibration(
 ):
     """Execute calibration step."""
     try:
-        results = service.execute_calibration(
-            pipeline_id=pipeline_id,
-            science_paths=request.science_paths,
-            master_bias_path=request.master_bias_path,
-            master_dark_path=request.master_dark_path,
-            master_flat_path=request.master_flat_path,
-        )
+        with _stack_slots:
+            results = service.execute_calibration(
+                pipeline_id=pipeline_id,
+                science_paths=request.science_paths,
+                master_bias_path=request.master_bias_path,
+                master_dark_path=request.master_dark_path,
+                master_flat_path=request.master_flat_path,
+                roi=request.roi,
+            )
         return results
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        logger.error(f"Error executing calibration: {e}")
+        logger.error("Error executing calibration: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/{pipeline_id}/analyze")
-async def execute_quality_analysis(
+def execute_quality_analysis(
     project_id: str,
     pipeline_id: str,
     request: QualityAnalysisRequest,
@@ -135,12 +175,12 @@ async def execute_quality_analysis(
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        logger.error(f"Error executing quality analysis: {e}")
+        logger.error("Error executing quality analysis: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/{pipeline_id}/register")
-async def execute_registration(
+def execute_registration(
     project_id: str,
     pipeline_id: str,
     request: RegistrationRequest,
@@ -157,12 +197,12 @@ async def execute_registration(
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        logger.error(f"Error executing registration: {e}")
+        logger.error("Error executing registration: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/{pipeline_id}/stack")
-async def execute_stacking(
+def execute_stacking(
     project_id: str,
     pipeline_id: str,
     request: StackingRequest,
@@ -170,22 +210,64 @@ async def execute_stacking(
 ):
     """Execute stacking/integration step."""
     try:
-        results = service.execute_stacking(
-            pipeline_id=pipeline_id,
-            file_paths=request.file_paths,
-            method=request.method,
-            rejection=request.rejection,
-        )
+        with _stack_slots:
+            results = service.execute_stacking(
+                pipeline_id=pipeline_id,
+                file_paths=request.file_paths,
+                method=request.method,
+                rejection=request.rejection,
+            )
         return results
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        logger.error(f"Error executing stacking: {e}")
+        logger.error("Error executing stacking: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{pipeline_id}/stacked/{filter_name}")
+def get_stacked_image(
+    project_id: str,
+    pipeline_id: str,
+    filter_name: str,
+    service: PipelineService = Depends(get_pipeline_service)
+):
+    """
+    Download the stacked image for a filter.
+
+    The FITS is streamed from disk (sendfile) rather than loaded; the
+    stacking details from its header are in the X-Result-Meta header.
+    """
+    try:
+        path = service.get_stacked_image(pipeline_id, filter_name)
+        if path is not None:
+            from astropy.io import fits
+
+            header = fits.getheader(path)
+            meta = {
+                "filter": filter_name,
+                "num_images": header.get("NSTACKED"),
+                "method": header.get("STKMETOD"),
+                "rejection": header.get("STKREJCT"),
+            }
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error("Error getting stacked image: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if path is None:
+        raise HTTPException(status_code=404, detail="Stacked image not found")
+    return FileResponse(
+        path=path,
+        filename=path.name,
+        media_type="application/fits",
+        headers={"X-Result-Meta": orjson.dumps(meta).decode()}
+    )
+
+
 @router.delete("/{pipeline_id}", status_code=204)
-async def delete_pipeline(
+def delete_pipeline(
     project_id: str,
     pipeline_id: str,
     service: PipelineService = Depends(get_pipeline_service)
@@ -193,11 +275,10 @@ async def delete_pipeline(
     """Delete a processing pipeline."""
     try:
         success = service.delete_pipeline(pipeline_id)
-        if not success:
-            raise HTTPException(status_code=404, detail="Pipeline not found")
-        return None
-    except HTTPException:
-        raise
     except Exception as e:
-        logger.error(f"Error deleting pipeline: {e}")
+        logger.error("Error deleting pipeline: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+
+    if not success:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    return None
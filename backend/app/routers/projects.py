@@ -2,25 +2,32 @@
 Project management API endpoints
 """
 from typing import List
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 import logging
 
 from app.models.project import Project, ProjectCreate, ProjectUpdate
-from app.services.project_service import ProjectService
+from app.services.project_service import ProjectService, shared_project_service
+from app.services.calibration import shared_master_service
+from app.services.processing import shared_pipeline_service
 from app.config import get_settings
+from app.utils.responses import json_response, value_etag
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/projects", tags=["projects"])
 
+# Single projects change rarely; lets a proxy or the browser answer repeat
+# reads briefly and revalidate with the ETag afterwards
+PROJECT_CACHE_CONTROL = "private, max-age=5, stale-while-revalidate=30"
+
 
 def get_project_service() -> ProjectService:
     """Dependency to get ProjectService instance"""
     settings = get_settings()
-    return ProjectService(settings.projects_base_dir)
+    return shared_project_service(settings.projects_base_dir)
 
 
 @router.post("/", response_model=Project, status_code=201)
-async def create_project(
+def create_project(
     project_data: ProjectCreate,
     service: ProjectService = Depends(get_project_service)
 ):
@@ -35,49 +42,65 @@ async def create_project(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error creating project: {e}")
+        logger.error("Error creating project: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/", response_model=List[Project])
-async def get_projects(service: ProjectService = Depends(get_project_service)):
+def get_projects(
+    request: Request,
+    service: ProjectService = Depends(get_project_service)
+):
     """
     Get all projects.
 
-    Returns a list of all astrophotography projects.
+    Returns a list of all astrophotography projects. Answers 304 when the
+    client's If-None-Match still matches the current ETag.
     """
     try:
+        etag = service.metadata_etag()
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
         projects = service.get_all_projects()
-        return projects
+        return json_response(List[Project], projects, headers={"ETag": etag})
     except Exception as e:
-        logger.error(f"Error getting projects: {e}")
+        logger.error("Error getting projects: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/{project_id}", response_model=Project)
-async def get_project(
+@router.head("/{project_id}", include_in_schema=False)
+def get_project(
     project_id: str,
+    request: Request,
     service: ProjectService = Depends(get_project_service)
 ):
     """
     Get a project by ID.
 
-    Returns detailed information about a specific project.
+    Returns detailed information about a specific project. Answers 304 when
+    the client's If-None-Match still matches the current ETag.
     """
     try:
         project = service.get_project(project_id)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        return project
-    except HTTPException:
-        raise
     except Exception as e:
-        logger.error(f"Error getting project {project_id}: {e}")
+        logger.error("Error getting project %s: %s", project_id, e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    headers = {
+        "ETag": value_etag(project.id, project.updated_at.isoformat()),
+        "Cache-Control": PROJECT_CACHE_CONTROL,
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return json_response(Project, project, headers=headers)
+
 
 @router.put("/{project_id}", response_model=Project)
-async def update_project(
+def update_project(
     project_id: str,
     project_data: ProjectUpdate,
     service: ProjectService = Depends(get_project_service)
@@ -89,18 +112,17 @@ async def update_project(
     """
     try:
         project = service.update_project(project_id, project_data)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        return project
-    except HTTPException:
-        raise
     except Exception as e:
-        logger.error(f"Error updating project {project_id}: {e}")
+        logger.error("Error updating project %s: %s", project_id, e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
 
 @router.delete("/{project_id}", status_code=204)
-async def delete_project(
+def delete_project(
     project_id: str,
     delete_files: bool = False,
     service: ProjectService = Depends(get_project_service)
@@ -114,18 +136,19 @@ async def delete_project(
     """
     try:
         success = service.delete_project(project_id, delete_files=delete_files)
-        if not success:
-            raise HTTPException(status_code=404, detail="Project not found")
-        return None
-    except HTTPException:
-        raise
     except Exception as e:
-        logger.error(f"Error deleting project {project_id}: {e}")
+        logger.error("Error deleting project %s: %s", project_id, e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+    if not success:
+        raise HTTPException(status_code=404, detail="Project not found")
+    shared_master_service.cache_clear()
+    shared_pipeline_service.cache_clear()
+    return None
+
 
 @router.get("/{project_id}/validate", response_model=dict)
-async def validate_project(
+def validate_project(
     project_id: str,
     service: ProjectService = Depends(get_project_service)
 ):
@@ -142,5 +165,5 @@ async def validate_project(
             "message": "Project structure is valid" if is_valid else "Project structure is invalid"
         }
     except Exception as e:
-        logger.error(f"Error validating project {project_id}: {e}")
+        logger.error("Error validating project %s: %s", project_id, e)
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,10 +1,19 @@
 """
 API endpoints for observing session management
 """
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Response
+from fastapi.responses import ORJSONResponse
+from typing import AsyncIterator, List, Optional
 from pathlib import Path
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import os
 import shutil
+import tempfile
+import time
+import anyio
+from astropy.io import fits
 
 from app.models.session import (
     ObservingSession,
@@ -14,59 +23,263 @@ from app.models.session import (
 )
 from app.models.common import GeoLocation
 from app.models.camera import CharacterizationInput
-from app.services.session_service import SessionService
+from app.services.session_service import SessionService, get_session_service
 from app.services.environmental_service import EnvironmentalService
 from app.services.camera_characterizer import CameraCharacterizer
-from app.services.target_selector import TargetSelector
+from app.services.target_selector import TargetSelector, get_target_selector
 from app.services.smart_scout import SmartScout
 from app.services.flight_planner import FlightPlanGenerator
 from app.services.visibility_service import VisibilityService
+from app.utils.responses import json_response
+from app.utils.process_pool import run_in_process
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 
-# Services
-session_service = SessionService()
+# Stateless services; the session store and target catalog are injected
 env_service = EnvironmentalService()
 camera_service = CameraCharacterizer()
-target_service = TargetSelector()
 scout_service = SmartScout()
 planner_service = FlightPlanGenerator()
 visibility_service = VisibilityService()
 
+# Scratch space for uploaded frames, one temporary directory per request
+TEMP_DIR = Path("./data/temp")
+
+# Upload directories left behind (by a crash or a shutdown before their
+# background removal ran) are swept once they are this old, this often
+TEMP_MAX_AGE = 60 * 60
+TEMP_SWEEP_INTERVAL = 15 * 60
+
+# Largest accepted calibration frame upload
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+
+# FITS headers are read in 2880-byte blocks; give up on a header longer
+# than this many blocks
+FITS_BLOCK_SIZE = 2880
+MAX_HEADER_BLOCKS = 64
+
+# IMAGETYP values (lowercased, single-spaced) accepted in each calibration slot
+CALIBRATION_IMAGE_TYPES = {
+    "bias": frozenset({"bias", "bias frame", "zero", "offset"}),
+    "flat": frozenset({"flat", "flat field", "flat frame"}),
+}
+
+# Buffer for copying uploads still held in memory
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Characterizations in flight (temp copies plus a pool job each); excess
+# requests wait here instead of all writing and queueing work at once
+_characterize_limiter = anyio.CapacityLimiter(os.cpu_count() or 1)
+
+
+def _save_upload(upload: UploadFile, path: Path) -> None:
+    """
+    Copy an uploaded file to disk (blocking, run it in a worker thread)
+
+    Uploads Starlette has already spooled to a temporary file (anything over
+    1 MiB, i.e. every real FITS frame) are copied in the kernel, without
+    bouncing the data through Python; small in-memory ones are copied with a
+    large buffer.
+    """
+    src = upload.file
+    with open(path, "wb") as f:
+        if getattr(src, "_rolled", False) and hasattr(os, "sendfile"):
+            src.flush()
+            _copy_file_in_kernel(src.fileno(), f.fileno())
+        else:
+            shutil.copyfileobj(src, f, COPY_BUFFER_SIZE)
+
+
+def _copy_file_in_kernel(src_fd: int, dst_fd: int) -> None:
+    """
+    Copy a whole file between descriptors without user-space buffers
+
+    The spooled upload is an unnamed temporary file, so it can't be renamed
+    into place. copy_file_range is tried first: it shares the extents
+    (reflink) on copy-on-write filesystems and is otherwise still a cheaper
+    in-kernel copy; sendfile finishes the copy where it isn't supported.
+    """
+    size = os.fstat(src_fd).st_size
+    offset = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < size:
+                copied = os.copy_file_range(src_fd, dst_fd, size - offset, offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError:
+            # Unsupported for this kernel or pair of filesystems
+            pass
+    while offset < size:
+        sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+        if sent == 0:
+            break
+        offset += sent
+
+
+def _check_upload_sizes(*uploads: UploadFile) -> None:
+    """Reject frames over MAX_UPLOAD_BYTES (413) before anything is copied"""
+    too_large = [
+        upload.filename for upload in uploads
+        if upload.size is not None and upload.size > MAX_UPLOAD_BYTES
+    ]
+    if too_large:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Frames larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MiB: {', '.join(too_large)}"
+        )
+
+
+async def _read_fits_header(upload: UploadFile) -> fits.Header:
+    """
+    Parse an upload's primary FITS header without reading its data
+
+    Reads 2880-byte blocks up to the one holding the END card, then
+    rewinds the upload for saving. Raises ValueError if it isn't FITS.
+    """
+    raw = b""
+    try:
+        for _ in range(MAX_HEADER_BLOCKS):
+            block = await upload.read(FITS_BLOCK_SIZE)
+            if len(block) < FITS_BLOCK_SIZE:
+                break
+            raw += block
+            if not raw.startswith(b"SIMPLE  ="):
+                break
+            if any(block[i:i + 80].rstrip() == b"END" for i in range(0, FITS_BLOCK_SIZE, 80)):
+                return fits.Header.fromstring(raw.decode("ascii"))
+    finally:
+        await upload.seek(0)
+    raise ValueError("not a FITS file")
+
+
+async def _check_calibration_headers(bias: List[UploadFile], flats: List[UploadFile]) -> None:
+    """
+    Reject (400) calibration uploads that can't be characterized together
+
+    Checked from the headers alone, before anything is copied or queued:
+    every frame is a 2D FITS image, all have the same size, and an
+    IMAGETYP, where present, matches the slot the frame was sent in.
+    """
+    slots = [("bias", upload) for upload in bias] + [("flat", upload) for upload in flats]
+    headers = await asyncio.gather(*(_read_fits_header(upload) for _, upload in slots), return_exceptions=True)
+
+    problems = []
+    sizes = set()
+    for (kind, upload), header in zip(slots, headers):
+        if isinstance(header, Exception):
+            problems.append(f"{upload.filename}: not a FITS file")
+            continue
+        if header.get("NAXIS") != 2:
+            problems.append(f"{upload.filename}: not a 2D image")
+            continue
+        size = (header.get("NAXIS1"), header.get("NAXIS2"))
+        if None in size:
+            problems.append(f"{upload.filename}: header is missing NAXIS1/NAXIS2")
+            continue
+        sizes.add(size)
+        image_type = header.get("IMAGETYP")
+        if image_type is not None and " ".join(str(image_type).lower().split()) not in CALIBRATION_IMAGE_TYPES[kind]:
+            problems.append(f"{upload.filename}: IMAGETYP is '{image_type}', expected a {kind} frame")
+
+    if len(sizes) > 1:
+        problems.append("frames are not all the same size")
+    if problems:
+        raise HTTPException(status_code=400, detail="Invalid calibration frames: " + "; ".join(problems))
+
+
+def _make_upload_dir(session_id: str) -> Path:
+    TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    return Path(tempfile.mkdtemp(dir=TEMP_DIR, prefix=f"{session_id}-"))
+
+
+@asynccontextmanager
+async def _upload_dir(session_id: str) -> AsyncIterator[Path]:
+    """
+    Temporary directory for one request's uploaded frames
+
+    Created in a worker thread; on exit (including errors) it is removed in
+    the background, so the response doesn't wait on the unlinks.
+    """
+    temp_dir = await asyncio.to_thread(_make_upload_dir, session_id)
+    try:
+        yield temp_dir
+    finally:
+        asyncio.get_running_loop().run_in_executor(None, shutil.rmtree, temp_dir, True)
+
+
+def _sweep_upload_dirs(max_age: float = TEMP_MAX_AGE) -> int:
+    """Remove upload directories older than max_age seconds; returns how many"""
+    if not TEMP_DIR.is_dir():
+        return 0
+
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(TEMP_DIR):
+        try:
+            if entry.is_dir(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+async def sweep_upload_dirs_periodically() -> None:
+    """Sweep stale upload directories at startup and then every TEMP_SWEEP_INTERVAL"""
+    while True:
+        try:
+            removed = await asyncio.to_thread(_sweep_upload_dirs)
+            if removed:
+                logger.info(f"Removed {removed} stale upload directories")
+        except OSError as e:
+            logger.warning(f"Error sweeping upload directories: {e}")
+        await asyncio.sleep(TEMP_SWEEP_INTERVAL)
+
 
 @router.post("/", response_model=ObservingSession)
-def create_session(session_data: SessionCreate):
+def create_session(
+    session_data: SessionCreate,
+    session_service: SessionService = Depends(get_session_service)
+):
     """Create a new observing session"""
     session = session_service.create_session(session_data)
-    return session
+    return json_response(ObservingSession, session)
 
 
 @router.get("/", response_model=List[SessionListItem])
-def list_sessions():
+def list_sessions(session_service: SessionService = Depends(get_session_service)):
     """List all observing sessions"""
-    return session_service.list_sessions()
+    return json_response(List[SessionListItem], session_service.list_sessions())
 
 
 @router.get("/{session_id}", response_model=ObservingSession)
-def get_session(session_id: str):
+def get_session(session_id: str, session_service: SessionService = Depends(get_session_service)):
     """Get session by ID"""
     session = session_service.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    return session
+    return json_response(ObservingSession, session)
 
 
 @router.patch("/{session_id}", response_model=ObservingSession)
-def update_session(session_id: str, update_data: SessionUpdate):
+def update_session(
+    session_id: str,
+    update_data: SessionUpdate,
+    session_service: SessionService = Depends(get_session_service)
+):
     """Update session data"""
     session = session_service.update_session(session_id, update_data)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    return session
+    return json_response(ObservingSession, session)
 
 
 @router.delete("/{session_id}")
-def delete_session(session_id: str):
+def delete_session(session_id: str, session_service: SessionService = Depends(get_session_service)):
     """Delete a session"""
     success = session_service.delete_session(session_id)
     if not success:
@@ -76,7 +289,7 @@ def delete_session(session_id: str):
 
 # STEP 1: Environmental Context
 @router.post("/{session_id}/step1/context", response_model=ObservingSession)
-def calculate_context(session_id: str):
+async def calculate_context(session_id: str, session_service: SessionService = Depends(get_session_service)):
     """
     Step 1: Calculate environmental context
 
@@ -86,18 +299,20 @@ def calculate_context(session_id: str):
 
     Uses the location from the session (set during creation)
     """
-    session = session_service.get_session(session_id)
+    # Session reads and writes touch the disk, so they run off the event loop too
+    session = await asyncio.to_thread(session_service.get_session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
     if not session.location:
         raise HTTPException(status_code=400, detail="Session must have a location set")
 
-    # Calculate ephemeris
-    ephemeris = env_service.calculate_ephemeris(session.location, session.date)
-
-    # Get sky conditions
-    conditions = env_service.get_sky_conditions(session.location)
+    # Calculate ephemeris and get sky conditions. They are independent, so
+    # the astropy work overlaps the weather API round trip
+    ephemeris, conditions = await asyncio.gather(
+        asyncio.to_thread(env_service.calculate_ephemeris, session.location, session.date),
+        asyncio.to_thread(env_service.get_sky_conditions, session.location),
+    )
 
     # Generate recommendations
     recommendation = env_service.generate_recommendations(conditions, ephemeris)
@@ -108,21 +323,22 @@ def calculate_context(session_id: str):
         ephemeris=ephemeris,
         status="step1_context"
     )
-    session = session_service.update_session(session_id, update_data)
 
-    # Add assistant message
-    session = session_service.add_message(
+    # Save it with the assistant message in one write
+    session = await asyncio.to_thread(
+        session_service.update_with_message,
         session_id,
+        update_data,
         step="step1_context",
         message=recommendation.message,
         data=recommendation.data
     )
 
-    return session
+    return json_response(ObservingSession, session)
 
 
 # STEP 2: Camera Characterization
-@router.post("/{session_id}/step2/characterize")
+@router.post("/{session_id}/step2/characterize", response_model=ObservingSession)
 async def characterize_camera(
     session_id: str,
     bias1: UploadFile = File(...),
@@ -130,7 +346,8 @@ async def characterize_camera(
     flat1: UploadFile = File(...),
     flat2: UploadFile = File(...),
     camera_model: str = Form("Unknown Camera"),
-    gain_setting: Optional[int] = Form(None)
+    gain_setting: Optional[int] = Form(None),
+    session_service: SessionService = Depends(get_session_service)
 ):
     """
     Step 2: Characterize camera sensor
@@ -144,76 +361,76 @@ async def characterize_camera(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    # Create temp directory for uploaded files
-    temp_dir = Path("./data/temp") / session_id
-    temp_dir.mkdir(parents=True, exist_ok=True)
-
-    try:
-        # Save uploaded files
-        bias1_path = temp_dir / "bias1.fits"
-        bias2_path = temp_dir / "bias2.fits"
-        flat1_path = temp_dir / "flat1.fits"
-        flat2_path = temp_dir / "flat2.fits"
-
-        with open(bias1_path, "wb") as f:
-            shutil.copyfileobj(bias1.file, f)
-        with open(bias2_path, "wb") as f:
-            shutil.copyfileobj(bias2.file, f)
-        with open(flat1_path, "wb") as f:
-            shutil.copyfileobj(flat1.file, f)
-        with open(flat2_path, "wb") as f:
-            shutil.copyfileobj(flat2.file, f)
-
-        # Characterize camera
-        char_input = CharacterizationInput(
-            bias_frames=[str(bias1_path), str(bias2_path)],
-            flat_frames=[str(flat1_path), str(flat2_path)],
-            camera_model=camera_model,
-            gain_setting=gain_setting
-        )
+    uploads = [
+        ("bias1.fits", bias1),
+        ("bias2.fits", bias2),
+        ("flat1.fits", flat1),
+        ("flat2.fits", flat2),
+    ]
+    _check_upload_sizes(*(upload for _, upload in uploads))
+    await _check_calibration_headers([bias1, bias2], [flat1, flat2])
+
+    async with _characterize_limiter:
+        async with _upload_dir(session_id) as temp_dir:
+            paths = [temp_dir / name for name, _ in uploads]
+
+            # Copy the uploads concurrently without blocking the event loop.
+            # Kept as four plain files rather than one tar bundle: the copies
+            # overlap, and characterize() reads each frame straight back from
+            # the page cache, whereas a bundle would serialize the writes and
+            # need each member buffered in memory again to be opened as FITS
+            await asyncio.gather(*(
+                asyncio.to_thread(_save_upload, upload, path)
+                for (_, upload), path in zip(uploads, paths)
+            ))
+
+            # Characterize camera
+            char_input = CharacterizationInput(
+                bias_frames=[str(path) for path in paths[:2]],
+                flat_frames=[str(path) for path in paths[2:]],
+                camera_model=camera_model,
+                gain_setting=gain_setting
+            )
+
+            # FITS loading and sigma-clipped statistics are CPU bound; a worker
+            # process lets concurrent characterizations use separate cores
+            result = await run_in_process(camera_service.characterize, char_input)
+
+    # Create sensor profile
+    sensor_profile = camera_service.create_sensor_profile(
+        result,
+        camera_model=camera_model,
+        gain_setting=gain_setting
+    )
 
-        result = camera_service.characterize(char_input)
+    # Update session
+    update_data = SessionUpdate(
+        camera_profile=sensor_profile,
+        status="step2_camera"
+    )
 
-        # Create sensor profile
-        sensor_profile = camera_service.create_sensor_profile(
-            result,
-            camera_model=camera_model,
-            gain_setting=gain_setting
-        )
+    # Generate message
+    message = f"Perfil actualizado. Tu cámara está rindiendo a **{result.read_noise}e-** de ruido de lectura. "
+    message += f"Gain: **{result.gain} e-/ADU**, Full Well: **{result.full_well_capacity:,} e-**. "
+    message += "El sistema está calibrado."
 
-        # Update session
-        update_data = SessionUpdate(
-            camera_profile=sensor_profile,
-            status="step2_camera"
-        )
-        session = session_service.update_session(session_id, update_data)
-
-        # Generate message
-        message = f"Perfil actualizado. Tu cámara está rindiendo a **{result.read_noise}e-** de ruido de lectura. "
-        message += f"Gain: **{result.gain} e-/ADU**, Full Well: **{result.full_well_capacity:,} e-**. "
-        message += "El sistema está calibrado."
-
-        if result.warnings:
-            message += f"\n\nAdvertencias: {'; '.join(result.warnings)}"
-
-        session = session_service.add_message(
-            session_id,
-            step="step2_camera",
-            message=message,
-            data={
-                "read_noise": result.read_noise,
-                "gain": result.gain,
-                "fwc": result.full_well_capacity,
-                "confidence": result.confidence
-            }
-        )
+    if result.warnings:
+        message += f"\n\nAdvertencias: {'; '.join(result.warnings)}"
 
-        return session
+    session = session_service.update_with_message(
+        session_id,
+        update_data,
+        step="step2_camera",
+        message=message,
+        data={
+            "read_noise": result.read_noise,
+            "gain": result.gain,
+            "fwc": result.full_well_capacity,
+            "confidence": result.confidence
+        }
+    )
 
-    finally:
-        # Cleanup temp files
-        if temp_dir.exists():
-            shutil.rmtree(temp_dir)
+    return json_response(ObservingSession, session)
 
 
 # STEP 3: Target Selection
@@ -223,7 +440,9 @@ def suggest_targets(
     sensor_width: int = 3008,
     sensor_height: int = 3008,
     pixel_size: float = 3.76,
-    focal_length: float = 600
+    focal_length: float = 600,
+    session_service: SessionService = Depends(get_session_service),
+    target_service: TargetSelector = Depends(get_target_selector)
 ):
     """
     Step 3: Get intelligent target suggestions
@@ -250,7 +469,7 @@ def suggest_targets(
     # Format response
     results = [
         {
-            "target": target.dict(),
+            "target": target.model_dump(),
             "score": metadata['total_score'],
             "visibility": metadata['visibility'],
             "fov_analysis": {
@@ -262,13 +481,17 @@ def suggest_targets(
         for target, metadata in suggestions
     ]
 
-    return {"suggestions": results}
+    # Scores and visibility carry numpy scalars; orjson serializes them
+    # directly instead of FastAPI's recursive jsonable_encoder walk
+    return ORJSONResponse({"suggestions": results})
 
 
 @router.post("/{session_id}/step3/select", response_model=ObservingSession)
 def select_target(
     session_id: str,
-    request: dict
+    request: dict,
+    session_service: SessionService = Depends(get_session_service),
+    target_service: TargetSelector = Depends(get_target_selector)
 ):
     """
     Step 3: Select and validate a target
@@ -300,9 +523,8 @@ def select_target(
     if session.equipment_profile_id:
         try:
             # Import here to avoid circular dependency
-            from app.services.equipment_service import EquipmentService
-            eq_service = EquipmentService()
-            profile = eq_service.get_profile(session.equipment_profile_id)
+            from app.services.equipment_service import get_equipment_service
+            profile = get_equipment_service().get_profile(session.equipment_profile_id)
             if profile:
                 sensor_width = profile.camera.sensor_width
                 sensor_height = profile.camera.sensor_height
@@ -337,29 +559,38 @@ def select_target(
         fov_simulation=fov_sim,
         status="step3_target"
     )
-    session = session_service.update_session(session_id, update_data)
 
     # Generate message
     message = f"Objetivo **{target.name}** ({target.catalog_id}) seleccionado.\n\n"
     message += "\n".join(f"• {rec}" for rec in validation['recommendations'])
 
-    session = session_service.add_message(
+    session = session_service.update_with_message(
         session_id,
+        update_data,
         step="step3_target",
         message=message,
-        data=validation
+        # Target and FOV are stored on the session; keep only what the
+        # validation adds (numpy scalars converted for storage)
+        data={
+            "target_name": target.name,
+            "catalog_id": target.catalog_id,
+            "feasible": bool(validation['feasible']),
+            "max_altitude": validation['visibility']['max_altitude'],
+            "optimal_hours": validation['visibility']['optimal_hours'],
+        }
     )
 
-    return session
+    return json_response(ObservingSession, session)
 
 
 # STEP 4: Smart Scout
-@router.post("/{session_id}/step4/analyze")
+@router.post("/{session_id}/step4/analyze", response_model=ObservingSession)
 async def analyze_scout_frame(
     session_id: str,
     exposure_time: float,
     filter_name: str = "L",
-    test_frame: UploadFile = File(...)
+    test_frame: UploadFile = File(...),
+    session_service: SessionService = Depends(get_session_service)
 ):
     """
     Step 4: Analyze test frame for optimal exposure
@@ -377,52 +608,55 @@ async def analyze_scout_frame(
     if not session.camera_profile:
         raise HTTPException(status_code=400, detail="Complete Step 2 first (camera characterization)")
 
-    # Save test frame
-    temp_dir = Path("./data/temp") / session_id
-    temp_dir.mkdir(parents=True, exist_ok=True)
+    _check_upload_sizes(test_frame)
 
-    try:
+    # Save test frame
+    async with _upload_dir(session_id) as temp_dir:
         test_path = temp_dir / "test_frame.fits"
-        with open(test_path, "wb") as f:
-            shutil.copyfileobj(test_frame.file, f)
-
-        # Analyze
-        analysis = scout_service.analyze_test_frame(
-            frame_path=str(test_path),
-            sensor_profile=session.camera_profile,
-            exposure_time=exposure_time,
-            filter_name=filter_name
-        )
-
-        # Update session
-        update_data = SessionUpdate(
-            scout_analysis=analysis,
-            status="step4_scout"
+        await asyncio.to_thread(_save_upload, test_frame, test_path)
+
+        # Analyze: background statistics and star detection are CPU bound,
+        # so like characterization they run in a worker process rather than
+        # a thread holding the GIL
+        analysis = await run_in_process(
+            scout_service.analyze_test_frame,
+            str(test_path),
+            session.camera_profile,
+            exposure_time,
+            filter_name
         )
-        session = session_service.update_session(session_id, update_data)
 
-        # Generate message
-        message = scout_service.generate_recommendations(analysis, session.camera_profile)
+    # Update session
+    update_data = SessionUpdate(
+        scout_analysis=analysis,
+        status="step4_scout"
+    )
 
-        session = session_service.add_message(
-            session_id,
-            step="step4_scout",
-            message=message,
-            data=analysis.dict()
-        )
+    # Generate message
+    message = scout_service.generate_recommendations(analysis, session.camera_profile)
 
-        return session
+    session = session_service.update_with_message(
+        session_id,
+        update_data,
+        step="step4_scout",
+        message=message,
+        # The full analysis is already stored in session.scout_analysis
+        data={
+            "hdr_required": analysis.hdr_required,
+            "optimal_exposure": analysis.optimal_exposure,
+            "snr_estimate": analysis.snr_estimate,
+        }
+    )
 
-    finally:
-        if temp_dir.exists():
-            shutil.rmtree(temp_dir)
+    return json_response(ObservingSession, session)
 
 
 # STEP 5: Flight Plan
-@router.post("/{session_id}/step5/generate")
+@router.post("/{session_id}/step5/generate", response_model=ObservingSession)
 def generate_flight_plan(
     session_id: str,
-    available_hours: float = None
+    available_hours: float = None,
+    session_service: SessionService = Depends(get_session_service)
 ):
     """
     Step 5: Generate complete acquisition plan
@@ -450,7 +684,6 @@ def generate_flight_plan(
         acquisition_plan=plan,
         status="step5_plan"
     )
-    session = session_service.update_session(session_id, update_data)
 
     # Generate message
     message = f"**Plan optimizado para {plan.target.name}:**\n\n"
@@ -469,50 +702,72 @@ def generate_flight_plan(
     if plan.hdr_strategy:
         message += f"\n\n⚠️ **Estrategia HDR activada**: combina exp. cortas ({plan.hdr_strategy['short_exposure']}s) y largas ({plan.hdr_strategy['long_exposure']}s)"
 
-    session = session_service.add_message(
+    session = session_service.update_with_message(
         session_id,
+        update_data,
         step="step5_plan",
         message=message,
-        data=plan.dict()
+        # The full plan is already stored in session.acquisition_plan; keep
+        # only a flat per-filter summary here instead of a second nested copy
+        # that every later session load/save would have to re-encode
+        data={
+            "light_filters": list(plan.lights),
+            "light_counts": [item.count for item in plan.lights.values()],
+            "light_exposures": [item.exposure for item in plan.lights.values()],
+            "total_time": plan.total_time,
+            "total_frames": plan.total_frames,
+        }
     )
 
-    return session
+    return json_response(ObservingSession, session)
 
 
 @router.get("/{session_id}/step5/export/{format}")
-def export_plan(session_id: str, format: str):
+def export_plan(
+    session_id: str,
+    format: str,
+    persist: bool = False,
+    session_service: SessionService = Depends(get_session_service)
+):
     """
     Step 5: Export plan to ASIAIR or NINA format
 
-    Formats: 'asiair' or 'nina'
+    Formats: 'asiair' or 'nina'. The file is rendered in memory and sent
+    directly; with persist=true a copy is also kept in data/plans.
     """
     session = session_service.get_session(session_id)
     if not session or not session.acquisition_plan:
         raise HTTPException(status_code=404, detail="No plan found")
 
-    output_dir = Path("./data/plans")
-    output_dir.mkdir(parents=True, exist_ok=True)
-
     if format == "asiair":
-        output_path = output_dir / f"{session_id}_asiair.plan"
-        planner_service.export_asiair(session.acquisition_plan, str(output_path))
+        filename = f"{session_id}_asiair.plan"
+        content = planner_service.render_asiair(session.acquisition_plan)
     elif format == "nina":
-        output_path = output_dir / f"{session_id}_nina.json"
-        planner_service.export_nina(session.acquisition_plan, str(output_path))
+        filename = f"{session_id}_nina.json"
+        content = planner_service.render_nina(session.acquisition_plan)
     else:
         raise HTTPException(status_code=400, detail="Format must be 'asiair' or 'nina'")
 
-    from fastapi.responses import FileResponse
-    return FileResponse(
-        path=output_path,
-        filename=output_path.name,
-        media_type="application/json"
+    if persist:
+        output_dir = Path("./data/plans")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        (output_dir / filename).write_bytes(content)
+
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
 
 # STEP 3 Enhancement: Visibility Calculations
 @router.get("/{session_id}/targets/{target_catalog_id}/visibility")
-def get_target_visibility(session_id: str, target_catalog_id: str):
+def get_target_visibility(
+    session_id: str,
+    target_catalog_id: str,
+    session_service: SessionService = Depends(get_session_service),
+    target_service: TargetSelector = Depends(get_target_selector)
+):
     """
     Get visibility curve for a specific target
 
@@ -559,10 +814,10 @@ def get_target_visibility(session_id: str, target_catalog_id: str):
         date=session.date
     )
 
-    return {
-        "target": target.dict(),
+    return ORJSONResponse({
+        "target": target.model_dump(),
         "visibility_curve": curve,
         "darkness_periods": darkness,
         "optimal_window": window,
         "moon": moon
-    }
+    })
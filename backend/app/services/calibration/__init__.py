@@ -2,9 +2,10 @@
 Calibration frame processing services
 """
 from .combiner import CalibrationCombiner
-from .master_service import MasterCalibrationService
+from .master_service import MasterCalibrationService, shared_master_service
 
 __all__ = [
     "CalibrationCombiner",
     "MasterCalibrationService",
+    "shared_master_service",
 ]
@@ -2,12 +2,44 @@
 Calibration frame combination using CCDProc
 """
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
 from typing import List, Optional, Literal
 import numpy as np
 
+from app.utils.nanstats import nanmedian, nan_sigma
+
 logger = logging.getLogger(__name__)
 
+# Imported once here rather than on every call (and every band)
+try:
+    from astropy.io import fits
+    from astropy.nddata import CCDData, StdDevUncertainty
+    _HAS_ASTROPY = True
+except ImportError:
+    _HAS_ASTROPY = False
+
+try:
+    from ccdproc import Combiner
+    _HAS_CCDPROC = True
+except ImportError:
+    _HAS_CCDPROC = False
+
+# Memory for one row band of the whole stack (float64) while combining
+COMBINE_BAND_BYTES = 64 * 1024 * 1024
+
+# Concurrent file opens while validating frames
+VALIDATE_MAX_WORKERS = 32
+
+# Lossless tile compression for masters written with compress=True
+MASTER_COMPRESSION = "GZIP_2"
+
+# Pixels per block when computing frame statistics, and the most pixels
+# the listed median is taken over
+FRAME_STATS_BLOCK = 1 << 20
+FRAME_MEDIAN_SAMPLE = 1 << 20
+
 
 class CalibrationCombiner:
     """
@@ -24,6 +56,7 @@ class CalibrationCombiner:
         sigma_clip_high_thresh: float = 3.0,
         minmax_min: int = 1,
         minmax_max: int = 1,
+        compress: bool = False,
     ) -> dict:
         """
         Combine multiple calibration frames into a master frame.
@@ -37,6 +70,8 @@ class CalibrationCombiner:
             sigma_clip_high_thresh: Sigma clipping high threshold
             minmax_min: Number of minimum values to reject
             minmax_max: Number of maximum values to reject
+            compress: Write the master's image, mask and uncertainty as
+                losslessly compressed extensions (smaller, slower to write)
 
         Returns:
             Dictionary with combination statistics
@@ -49,84 +84,127 @@ class CalibrationCombiner:
         if not file_paths:
             raise ValueError("No files provided for combination")
 
-        try:
-            from astropy.io import fits
-            from astropy.nddata import CCDData
-            import astropy.units as u
-            from ccdproc import combine, Combiner
+        if not (_HAS_ASTROPY and _HAS_CCDPROC):
+            logger.error("Missing required library: astropy or ccdproc")
+            raise ImportError(
+                "Astropy and CCDProc are required for calibration frame combination. "
+                "Install with: pip install astropy ccdproc"
+            )
 
+        try:
             logger.info(f"Combining {len(file_paths)} frames using {method} with {rejection or 'no'} rejection")
 
-            # Load all frames
-            ccd_list = []
-            for file_path in file_paths:
-                try:
-                    ccd = CCDData.read(file_path, unit='adu')
-                    ccd_list.append(ccd)
-                    logger.debug(f"Loaded: {file_path}")
-                except Exception as e:
-                    logger.error(f"Error loading {file_path}: {e}")
-                    continue
-
-            if not ccd_list:
-                raise ValueError("No valid frames could be loaded")
-
-            # Create combiner
-            combiner = Combiner(ccd_list)
-
-            # Apply rejection method
-            if rejection == "sigma_clip":
-                combiner.sigma_clipping(
-                    low_thresh=sigma_clip_low_thresh,
-                    high_thresh=sigma_clip_high_thresh,
-                    func=np.ma.median
-                )
-                logger.debug(f"Applied sigma clipping: low={sigma_clip_low_thresh}, high={sigma_clip_high_thresh}")
-
-            elif rejection == "minmax":
-                combiner.minmax_clipping(min_clip=minmax_min, max_clip=minmax_max)
-                logger.debug(f"Applied minmax clipping: min={minmax_min}, max={minmax_max}")
-
-            # Combine frames
-            if method == "average":
-                master = combiner.average_combine()
-            elif method == "median":
-                master = combiner.median_combine()
-            else:
+            if method not in ("average", "median"):
                 raise ValueError(f"Invalid combination method: {method}")
 
+            with ExitStack() as open_files:
+                # Open all frames; pixels are read band by band below
+                hdus = []
+                for file_path in file_paths:
+                    try:
+                        hdu = open_files.enter_context(fits.open(file_path))[0]
+                        if not hdu.header.get('NAXIS'):
+                            raise ValueError("No data in primary HDU")
+                        hdus.append(hdu)
+                        logger.debug(f"Opened: {file_path}")
+                    except Exception as e:
+                        logger.error(f"Error loading {file_path}: {e}")
+                        continue
+
+                if not hdus:
+                    raise ValueError("No valid frames could be loaded")
+                if len({hdu.shape for hdu in hdus}) > 1:
+                    raise ValueError("Frames are not the same size")
+
+                height, width = hdus[0].shape
+                data = np.empty((height, width))
+                mask = np.empty((height, width), dtype=bool)
+                uncertainty = np.empty((height, width))
+
+                # Rejection and combination are per pixel, so combining row
+                # bands gives the same master while only one band of every
+                # frame is in memory at a time
+                band_rows = max(1, COMBINE_BAND_BYTES // (len(hdus) * width * 8))
+                stats = _RunningStats(height * width)
+                for y0 in range(0, height, band_rows):
+                    y1 = min(y0 + band_rows, height)
+                    band = CalibrationCombiner._combine_band(
+                        [CCDData(hdu.section[y0:y1, :], unit='adu') for hdu in hdus],
+                        method=method,
+                        rejection=rejection,
+                        sigma_clip_low_thresh=sigma_clip_low_thresh,
+                        sigma_clip_high_thresh=sigma_clip_high_thresh,
+                        minmax_min=minmax_min,
+                        minmax_max=minmax_max,
+                    )
+                    data[y0:y1] = band.data
+                    stats.add(band.data)
+                    mask[y0:y1] = band.mask
+                    uncertainty[y0:y1] = band.uncertainty.array
+
+            master = CCDData(
+                data,
+                unit=band.unit,
+                mask=mask,
+                uncertainty=StdDevUncertainty(uncertainty),
+                meta=band.meta,
+            )
+            num_frames = len(hdus)
+
             # Save master frame
             output_path_obj = Path(output_path)
             output_path_obj.parent.mkdir(parents=True, exist_ok=True)
 
-            master.write(str(output_path_obj), overwrite=True)
+            if compress:
+                _write_compressed(master, output_path_obj)
+            else:
+                master.write(str(output_path_obj), overwrite=True)
             logger.info(f"Master frame saved to: {output_path_obj}")
 
-            # Gather statistics
-            stats = {
-                "num_frames": len(ccd_list),
+            # Statistics were accumulated band by band while combining
+            return {
+                "num_frames": num_frames,
                 "method": method,
                 "rejection": rejection,
                 "output_path": str(output_path_obj),
-                "mean": float(np.mean(master.data)),
-                "median": float(np.median(master.data)),
-                "std": float(np.std(master.data)),
-                "min": float(np.min(master.data)),
-                "max": float(np.max(master.data)),
+                "compressed": compress,
+                **stats.result(),
             }
 
-            return stats
-
-        except ImportError as e:
-            logger.error(f"Missing required library: {e}")
-            raise ImportError(
-                "Astropy and CCDProc are required for calibration frame combination. "
-                "Install with: pip install astropy ccdproc"
-            )
         except Exception as e:
             logger.error(f"Error combining frames: {e}")
             raise
 
+    @staticmethod
+    def _combine_band(
+        ccd_list: list,
+        method: Literal["average", "median"],
+        rejection: Optional[Literal["minmax", "sigma_clip"]],
+        sigma_clip_low_thresh: float,
+        sigma_clip_high_thresh: float,
+        minmax_min: int,
+        minmax_max: int,
+    ):
+        """Reject and combine one band of the frames (CCDData list) into a CCDData"""
+        combiner = Combiner(ccd_list)
+
+        # Apply rejection method
+        if rejection == "sigma_clip":
+            combiner.sigma_clipping(
+                low_thresh=sigma_clip_low_thresh,
+                high_thresh=sigma_clip_high_thresh,
+                func="median"
+            )
+        elif rejection == "minmax":
+            combiner.minmax_clipping(min_clip=minmax_min, max_clip=minmax_max)
+
+        # Combine frames
+        if method == "average":
+            return combiner.average_combine()
+        # Same result as the defaults (numpy nanmedian and sigma_func),
+        # without numpy's masked-array fallback for short stacks
+        return combiner.median_combine(median_func=nanmedian, uncertainty_func=nan_sigma)
+
     @staticmethod
     def validate_frames(file_paths: List[str]) -> dict:
         """
@@ -138,39 +216,50 @@ class CalibrationCombiner:
         Returns:
             Dictionary with validation results
         """
-        try:
-            from astropy.io import fits
-
-            valid_files = []
-            invalid_files = []
-            dimensions = set()
-
-            for file_path in file_paths:
-                try:
-                    with fits.open(file_path) as hdul:
-                        data = hdul[0].data
-                        if data is not None:
-                            dimensions.add(data.shape)
-                            valid_files.append(file_path)
-                        else:
-                            invalid_files.append((file_path, "No data in primary HDU"))
-                except Exception as e:
-                    invalid_files.append((file_path, str(e)))
-
-            # Check if all frames have same dimensions
-            dimension_mismatch = len(dimensions) > 1
+        if not _HAS_ASTROPY:
+            raise ImportError("Astropy is required for frame validation")
 
-            return {
-                "valid_count": len(valid_files),
-                "invalid_count": len(invalid_files),
-                "valid_files": valid_files,
-                "invalid_files": invalid_files,
-                "dimensions": list(dimensions),
-                "dimension_mismatch": dimension_mismatch,
-            }
+        def probe(file_path: str):
+            # The shape comes from the header; the pixels are never read
+            try:
+                with fits.open(file_path) as hdul:
+                    hdu = hdul[0]
+                    if not hdu.header.get('NAXIS'):
+                        return None, "No data in primary HDU"
+                    return hdu.shape, None
+            except Exception as e:
+                return None, str(e)
+
+        # Opening files is I/O bound, so probe them concurrently
+        workers = min(VALIDATE_MAX_WORKERS, len(file_paths))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(probe, file_paths))
+        else:
+            results = [probe(file_path) for file_path in file_paths]
+
+        valid_files = []
+        invalid_files = []
+        dimensions = set()
+
+        for file_path, (shape, error) in zip(file_paths, results):
+            if error is None:
+                dimensions.add(shape)
+                valid_files.append(file_path)
+            else:
+                invalid_files.append((file_path, error))
 
-        except ImportError:
-            raise ImportError("Astropy is required for frame validation")
+        # Check if all frames have same dimensions
+        dimension_mismatch = len(dimensions) > 1
+
+        return {
+            "valid_count": len(valid_files),
+            "invalid_count": len(invalid_files),
+            "valid_files": valid_files,
+            "invalid_files": invalid_files,
+            "dimensions": list(dimensions),
+            "dimension_mismatch": dimension_mismatch,
+        }
 
     @staticmethod
     def get_frame_info(file_path: str) -> dict:
@@ -183,24 +272,38 @@ class CalibrationCombiner:
         Returns:
             Dictionary with frame information
         """
+        filename = Path(file_path).name
+
         try:
-            from astropy.io import fits
+            if not _HAS_ASTROPY:
+                raise ImportError("Astropy is required to read frames")
 
-            with fits.open(file_path) as hdul:
+            # Integer frames stored with BZERO/BSCALE (e.g. uint16) are read
+            # raw so the memory-mapped pixels aren't copied into a scaled
+            # array; the statistics are scaled instead
+            with fits.open(file_path, do_not_scale_image_data=True) as hdul:
                 header = hdul[0].header
                 data = hdul[0].data
+                bscale = header.get('BSCALE', 1)
+                bzero = header.get('BZERO', 0)
 
                 info = {
-                    "filename": Path(file_path).name,
+                    "filename": filename,
                     "path": file_path,
                     "dimensions": data.shape if data is not None else None,
-                    "dtype": str(data.dtype) if data is not None else None,
-                    "mean": float(np.mean(data)) if data is not None else None,
-                    "median": float(np.median(data)) if data is not None else None,
-                    "std": float(np.std(data)) if data is not None else None,
-                    "min": float(np.min(data)) if data is not None else None,
-                    "max": float(np.max(data)) if data is not None else None,
                 }
+                if data is None:
+                    info["dtype"] = None
+                    info.update(dict.fromkeys(("mean", "median", "std", "min", "max")))
+                elif (bscale == 1 and bzero == 0) or 'BLANK' in header:
+                    if 'BLANK' in header:
+                        # Blank pixels only become NaN when scaled
+                        data = fits.getdata(file_path)
+                    info["dtype"] = str(data.dtype)
+                    info.update(_frame_stats(data))
+                else:
+                    info["dtype"] = _scaled_dtype(header)
+                    info.update(_scale_stats(_frame_stats(data), bscale, bzero))
 
                 # Add relevant header keywords
                 for key in ['EXPTIME', 'GAIN', 'INSTRUME', 'CCD-TEMP', 'IMAGETYP']:
@@ -211,4 +314,116 @@ class CalibrationCombiner:
 
         except Exception as e:
             logger.error(f"Error getting frame info for {file_path}: {e}")
-            return {"filename": Path(file_path).name, "error": str(e)}
+            return {"filename": filename, "error": str(e)}
+
+
+def _scaled_dtype(header) -> str:
+    """dtype astropy gives an integer image with non-trivial BZERO/BSCALE"""
+    bitpix = header['BITPIX']
+    if header.get('BSCALE', 1) == 1:
+        if bitpix == 8 and header.get('BZERO') == -128:
+            return 'int8'
+        if bitpix > 8 and header.get('BZERO') == 2 ** (bitpix - 1):
+            return f'uint{bitpix}'
+    return 'float32' if bitpix in (8, 16) else 'float64'
+
+
+def _scale_stats(stats: dict, bscale: float, bzero: float) -> dict:
+    """Statistics of raw pixels mapped to physical values (bscale * raw + bzero)"""
+    low, high = sorted((stats["min"] * bscale + bzero, stats["max"] * bscale + bzero))
+    return {
+        "mean": stats["mean"] * bscale + bzero,
+        "median": stats["median"] * bscale + bzero,
+        "std": stats["std"] * abs(bscale),
+        "min": low,
+        "max": high,
+    }
+
+
+def _write_compressed(master, output_path: Path) -> None:
+    """
+    Write a CCDData as tile-compressed FITS
+
+    Each image HDU (data, MASK, UNCERT) becomes a CompImageHDU after an
+    empty primary. GZIP_2 without quantization keeps the float values
+    exact; Rice would quantize them, which calibration masters can't afford.
+    """
+    hdus = [fits.PrimaryHDU()]
+    hdus.extend(
+        fits.CompImageHDU(
+            data=hdu.data,
+            header=hdu.header,
+            compression_type=MASTER_COMPRESSION,
+            quantize_level=0,
+        )
+        for hdu in master.to_hdu()
+    )
+    fits.HDUList(hdus).writeto(str(output_path), overwrite=True)
+
+
+def _frame_stats(data: np.ndarray) -> dict:
+    """
+    Summary statistics of a frame for listings
+
+    Works through the pixels in blocks so no full-frame float64 temporaries
+    are made.
+    """
+    pixels = data.ravel()
+    stats = _RunningStats(pixels.size)
+    for start in range(0, pixels.size, FRAME_STATS_BLOCK):
+        stats.add(pixels[start:start + FRAME_STATS_BLOCK])
+    return stats.result()
+
+
+class _RunningStats:
+    """
+    Mean, std, min, max and median of a frame fed as consecutive blocks
+
+    Block means and squared deviations are merged pairwise (Chan et al.),
+    which stays accurate where sum/sum-of-squares would cancel. The median
+    is taken over an evenly strided sample of at most FRAME_MEDIAN_SAMPLE
+    pixels instead of sorting the whole frame.
+    """
+
+    def __init__(self, size: int):
+        self.step = max(1, size // FRAME_MEDIAN_SAMPLE)
+        self.count = 0
+        self.mean = 0.0
+        self.squares = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.samples = []
+
+    def add(self, block: np.ndarray):
+        """Add the next block of pixels in frame order"""
+        pixels = block.ravel()
+        n = pixels.size
+        if not n:
+            return
+
+        block_mean = np.add.reduce(pixels, dtype=np.float64) / n
+        deviation = pixels.astype(np.float64) - block_mean
+        block_squares = float(np.dot(deviation, deviation))
+
+        total = self.count + n
+        delta = block_mean - self.mean
+        self.mean += delta * n / total
+        self.squares += block_squares + delta * delta * self.count * n / total
+
+        # Keep the same positions a stride over the whole frame would; copied,
+        # since a strided view would keep the whole block alive
+        self.samples.append(pixels[-self.count % self.step::self.step].copy())
+        self.count = total
+
+        # np.minimum/maximum propagate NaN like np.min/max over the frame
+        self.min = np.minimum(self.min, np.min(pixels))
+        self.max = np.maximum(self.max, np.max(pixels))
+
+    def result(self) -> dict:
+        return {
+            "mean": float(self.mean),
+            "median": float(np.median(np.concatenate(self.samples))),
+            "std": float(np.sqrt(self.squares / self.count)),
+            "min": float(self.min),
+            "max": float(self.max),
+        }
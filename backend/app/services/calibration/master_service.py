@@ -1,18 +1,27 @@
 """
 Master calibration frame management service
 """
-import json
 import logging
+import os
+import threading
 import uuid
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Literal, Dict, Any
+from typing import List, Optional, Literal, Dict, Any, Iterator, Tuple
+
+import orjson
 
 from app.models.metadata import MasterCalibration, CalibrationSession
 from app.services.calibration.combiner import CalibrationCombiner
 
 logger = logging.getLogger(__name__)
 
+FITS_EXTENSIONS = frozenset({"fit", "fits", "FIT", "FITS"})
+
+# Logged mutations after which .masters.json is rewritten and the log cleared
+METADATA_LOG_COMPACT_LINES = 256
+
 
 class MasterCalibrationService:
     """Service for managing master calibration frames"""
@@ -27,32 +36,139 @@ class MasterCalibrationService:
         self.project_path = Path(project_path)
         self.masters_dir = self.project_path / "02_processed_data" / "masters"
         self.metadata_file = self.masters_dir / ".masters.json"
+        # Mutations since the last snapshot, one JSON object per line
+        self.log_file = self.masters_dir / ".masters.log.jsonl"
+        # (snapshot, log) file versions -> (metadata, sessions by ID, masters by ID)
+        self._cache: Optional[
+            Tuple[tuple, dict, Dict[str, dict], Dict[str, dict]]
+        ] = None
+        self._log_lines = 0
+        self._log_torn = False
+        self._lock = threading.Lock()
         self._ensure_metadata_file()
 
     def _ensure_metadata_file(self):
         """Ensure the masters metadata file exists"""
         self.masters_dir.mkdir(parents=True, exist_ok=True)
         if not self.metadata_file.exists():
-            self.metadata_file.write_text(json.dumps({
+            self.metadata_file.write_bytes(orjson.dumps({
                 "sessions": [],
                 "masters": []
-            }, indent=2))
+            }, option=orjson.OPT_INDENT_2))
 
-    def _read_metadata(self) -> dict:
-        """Read masters metadata from file"""
+    def _load_metadata(self) -> dict:
+        """Read the masters metadata snapshot from file"""
         try:
-            return json.loads(self.metadata_file.read_text())
+            return orjson.loads(self.metadata_file.read_bytes())
         except Exception as e:
             logger.error(f"Error reading metadata: {e}")
             return {"sessions": [], "masters": []}
 
+    def _load_log(self) -> List[dict]:
+        """Read the mutations logged since the snapshot"""
+        try:
+            log = self.log_file.read_bytes()
+        except FileNotFoundError:
+            return []
+        # A write cut short by a crash leaves no trailing newline
+        self._log_torn = bool(log) and not log.endswith(b"\n")
+
+        changes = []
+        for line in log.splitlines():
+            if not line:
+                continue
+            try:
+                changes.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                logger.warning(f"Skipping malformed line in {self.log_file}")
+        return changes
+
+    def _files_version(self) -> tuple:
+        snapshot = self.metadata_file.stat()
+        try:
+            log = self.log_file.stat()
+            log_version = (log.st_mtime_ns, log.st_size)
+        except FileNotFoundError:
+            log_version = None
+        return snapshot.st_mtime_ns, snapshot.st_size, log_version
+
+    def _metadata_index(self) -> Tuple[dict, Dict[str, dict], Dict[str, dict]]:
+        """
+        Metadata with sessions and masters by ID, re-read only when the
+        snapshot or the log changes on disk
+        """
+        try:
+            key = self._files_version()
+        except OSError as e:
+            logger.error(f"Error reading metadata: {e}")
+            return self._index_metadata({"sessions": [], "masters": []})
+        cache = self._cache
+        if cache is None or cache[0] != key:
+            index = self._index_metadata(self._load_metadata())
+            changes = self._load_log()
+            for change in changes:
+                _apply_change(index, change["op"], change["data"])
+            self._log_lines = len(changes)
+            cache = (key, *index)
+            self._cache = cache
+        return cache[1:]
+
+    @staticmethod
+    def _index_metadata(data: dict) -> Tuple[dict, Dict[str, dict], Dict[str, dict]]:
+        return (
+            data,
+            {s["id"]: s for s in data["sessions"]},
+            {m["id"]: m for m in data["masters"]},
+        )
+
+    def _read_metadata(self) -> dict:
+        """Masters metadata, shared with the cache"""
+        return self._metadata_index()[0]
+
+    def _record_change(self, op: str, data: dict):
+        """
+        Append one mutation to the log and apply it to the cached metadata
+
+        Each mutation writes a single line instead of the whole metadata
+        file; the snapshot is rewritten once the log reaches
+        METADATA_LOG_COMPACT_LINES.
+        """
+        with self._lock:
+            index = self._metadata_index()
+            line = orjson.dumps({"op": op, "data": data}, default=str) + b"\n"
+            if self._log_torn:
+                line = b"\n" + line
+            self._cache = None
+            try:
+                with open(self.log_file, "ab") as f:
+                    f.write(line)
+                self._log_torn = False
+            except Exception as e:
+                logger.error(f"Error writing metadata: {e}")
+                raise
+            _apply_change(index, op, data)
+            self._log_lines += 1
+
+            if self._log_lines >= METADATA_LOG_COMPACT_LINES:
+                self._write_metadata(index[0])
+            else:
+                self._cache = (self._files_version(), *index)
+
     def _write_metadata(self, data: dict):
-        """Write masters metadata to file"""
+        """Atomically replace the metadata snapshot and clear the log"""
+        self._cache = None
+        tmp_file = self.metadata_file.with_name(self.metadata_file.name + ".tmp")
         try:
-            self.metadata_file.write_text(json.dumps(data, indent=2, default=str))
+            tmp_file.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2, default=str))
+            os.replace(tmp_file, self.metadata_file)
+            # Replaying is idempotent, so a crash before this truncate is harmless
+            self.log_file.write_bytes(b"")
+            self._log_torn = False
         except Exception as e:
             logger.error(f"Error writing metadata: {e}")
             raise
+        self._log_lines = 0
+        self._cache = (self._files_version(), *self._index_metadata(data))
 
     def create_session(self, name: str, date: str, telescope: Optional[str] = None,
                        camera: Optional[str] = None) -> CalibrationSession:
@@ -78,9 +194,7 @@ class MasterCalibrationService:
             created_at=datetime.now()
         )
 
-        metadata = self._read_metadata()
-        metadata["sessions"].append(session.model_dump())
-        self._write_metadata(metadata)
+        self._record_change("add_session", session.model_dump())
 
         logger.info(f"Created calibration session: {name} (ID: {session_id})")
         return session
@@ -92,26 +206,23 @@ class MasterCalibrationService:
 
     def get_session(self, session_id: str) -> Optional[CalibrationSession]:
         """Get a calibration session by ID"""
-        metadata = self._read_metadata()
-        for s in metadata["sessions"]:
-            if s["id"] == session_id:
-                return CalibrationSession(**s)
-        return None
+        session = self._metadata_index()[1].get(session_id)
+        return CalibrationSession(**session) if session else None
 
-    def scan_calibration_frames(
+    def iter_calibration_frames(
         self,
         session_name: str,
         frame_type: Literal["bias", "darks", "flats"]
-    ) -> List[Dict[str, Any]]:
+    ) -> Iterator[Dict[str, Any]]:
         """
-        Scan for calibration frames in a session directory.
+        Scan for calibration frames in a session directory, one frame at a time.
 
         Args:
             session_name: Name of the calibration session
             frame_type: Type of frames to scan for
 
-        Returns:
-            List of frame information dictionaries
+        Yields:
+            Frame information dictionaries
         """
         frames_dir = (
             self.project_path / "01_raw_data" / "calibration" / session_name / frame_type
@@ -119,22 +230,46 @@ class MasterCalibrationService:
 
         if not frames_dir.exists():
             logger.warning(f"Frames directory does not exist: {frames_dir}")
-            return []
+            return
 
-        frames = []
-        fits_extensions = ['.fit', '.fits', '.FIT', '.FITS']
+        count = 0
 
-        for file_path in frames_dir.iterdir():
-            if file_path.is_file() and file_path.suffix in fits_extensions:
+        # scandir's DirEntry carries the file type from readdir, so filtering
+        # needs no stat() per entry
+        with os.scandir(frames_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith("."):
+                    continue
+                ext = name.rpartition(".")[2]
+                if ext not in FITS_EXTENSIONS or not entry.is_file(follow_symlinks=False):
+                    continue
                 try:
-                    info = CalibrationCombiner.get_frame_info(str(file_path))
-                    frames.append(info)
+                    info = CalibrationCombiner.get_frame_info(entry.path)
                 except Exception as e:
-                    logger.error(f"Error getting info for {file_path}: {e}")
+                    logger.error(f"Error getting info for {entry.path}: {e}")
                     continue
+                count += 1
+                yield info
+
+        logger.info(f"Found {count} {frame_type} frames in session {session_name}")
+
+    def scan_calibration_frames(
+        self,
+        session_name: str,
+        frame_type: Literal["bias", "darks", "flats"]
+    ) -> List[Dict[str, Any]]:
+        """
+        Scan for calibration frames in a session directory.
 
-        logger.info(f"Found {len(frames)} {frame_type} frames in session {session_name}")
-        return frames
+        Args:
+            session_name: Name of the calibration session
+            frame_type: Type of frames to scan for
+
+        Returns:
+            List of frame information dictionaries
+        """
+        return list(self.iter_calibration_frames(session_name, frame_type))
 
     def create_master(
         self,
@@ -219,9 +354,7 @@ class MasterCalibrationService:
         )
 
         # Save to metadata
-        metadata = self._read_metadata()
-        metadata["masters"].append(master.model_dump())
-        self._write_metadata(metadata)
+        self._record_change("add_master", master.model_dump())
 
         logger.info(f"Created master calibration: {filename} (ID: {master_id})")
         return master
@@ -246,11 +379,8 @@ class MasterCalibrationService:
 
     def get_master(self, master_id: str) -> Optional[MasterCalibration]:
         """Get a master calibration frame by ID"""
-        metadata = self._read_metadata()
-        for m in metadata["masters"]:
-            if m["id"] == master_id:
-                return MasterCalibration(**m)
-        return None
+        master = self._metadata_index()[2].get(master_id)
+        return MasterCalibration(**master) if master else None
 
     def delete_master(self, master_id: str, delete_file: bool = False) -> bool:
         """
@@ -263,15 +393,7 @@ class MasterCalibrationService:
         Returns:
             True if deleted, False if not found
         """
-        metadata = self._read_metadata()
-        master = None
-
-        # Find and remove master
-        for i, m in enumerate(metadata["masters"]):
-            if m["id"] == master_id:
-                master = m
-                metadata["masters"].pop(i)
-                break
+        master = self._metadata_index()[2].get(master_id)
 
         if not master:
             return False
@@ -290,6 +412,38 @@ class MasterCalibrationService:
                         raise
 
         # Save metadata
-        self._write_metadata(metadata)
+        self._record_change("delete_master", {"id": master_id})
         logger.info(f"Deleted master calibration: {master['filename']} (ID: {master_id})")
         return True
+
+
+def _apply_change(
+    index: Tuple[dict, Dict[str, dict], Dict[str, dict]], op: str, data: dict
+):
+    # Adds skip IDs already present, so replaying a log over a snapshot that
+    # already includes it changes nothing
+    metadata, sessions_by_id, masters_by_id = index
+    if op == "add_session":
+        if data["id"] not in sessions_by_id:
+            metadata["sessions"].append(data)
+            sessions_by_id[data["id"]] = data
+    elif op == "add_master":
+        if data["id"] not in masters_by_id:
+            metadata["masters"].append(data)
+            masters_by_id[data["id"]] = data
+    elif op == "delete_master":
+        if masters_by_id.pop(data["id"], None) is not None:
+            metadata["masters"] = [m for m in metadata["masters"] if m["id"] != data["id"]]
+    else:
+        logger.warning(f"Unknown masters metadata change: {op}")
+
+
+@lru_cache(maxsize=256)
+def shared_master_service(project_path: str) -> MasterCalibrationService:
+    """
+    Get the process-wide MasterCalibrationService for a project directory
+
+    Call shared_master_service.cache_clear() when projects are deleted, since
+    the cached service assumes its masters directory exists.
+    """
+    return MasterCalibrationService(project_path)
@@ -5,10 +5,10 @@ from pathlib import Path
 from typing import List, Tuple
 import numpy as np
 from astropy.io import fits
-from astropy.stats import sigma_clipped_stats
 
 from app.models.camera import CharacterizationInput, CharacterizationResult
 from app.models.session import SensorProfile
+from app.utils.nanstats import clipped_stats
 
 
 class CameraCharacterizer:
@@ -49,13 +49,13 @@ class CameraCharacterizer:
         flat2_data = self._load_fits(input_data.flat_frames[1])
 
         # Calculate bias statistics
-        bias1_mean, bias1_median, bias1_std = sigma_clipped_stats(bias1_data, sigma=3.0)
-        bias2_mean, bias2_median, bias2_std = sigma_clipped_stats(bias2_data, sigma=3.0)
+        bias1_mean, bias1_median, bias1_std = clipped_stats(bias1_data, sigma=3.0)
+        bias2_mean, bias2_median, bias2_std = clipped_stats(bias2_data, sigma=3.0)
         bias_level = (bias1_mean + bias2_mean) / 2
 
         # Calculate flat statistics
-        flat1_mean, flat1_median, flat1_std = sigma_clipped_stats(flat1_data, sigma=3.0)
-        flat2_mean, flat2_median, flat2_std = sigma_clipped_stats(flat2_data, sigma=3.0)
+        flat1_mean, flat1_median, flat1_std = clipped_stats(flat1_data, sigma=3.0)
+        flat2_mean, flat2_median, flat2_std = clipped_stats(flat2_data, sigma=3.0)
 
         # Check flat levels (should be around 40-60% of max)
         flat_level_percent = (flat1_mean / 65535) * 100  # Assuming 16-bit
@@ -64,8 +64,10 @@ class CameraCharacterizer:
 
         # Calculate GAIN from flats (photon transfer method)
         # Gain = mean² / variance
-        flat_diff = flat1_data.astype(float) - flat2_data.astype(float)
-        flat_diff_var = np.var(flat_diff) / 2  # Divide by 2 (variance of difference)
+        # One float32 buffer holds the flat difference, then the bias difference,
+        # widened straight from the frames' own dtype; reductions accumulate in float64
+        diff = np.subtract(flat1_data, flat2_data, dtype=np.float32)
+        flat_diff_var = np.var(diff, dtype=np.float64) / 2  # Divide by 2 (variance of difference)
         flat_mean = (flat1_mean + flat2_mean) / 2 - bias_level  # Subtract bias
 
         if flat_diff_var > 0 and flat_mean > 0:
@@ -75,8 +77,8 @@ class CameraCharacterizer:
             warnings.append("Could not calculate gain reliably. Using default: 1.0")
 
         # Calculate READ NOISE from bias frames (in ADU first)
-        bias_diff = bias1_data.astype(float) - bias2_data.astype(float)
-        read_noise_adu = np.std(bias_diff) / np.sqrt(2)
+        bias_diff = np.subtract(bias1_data, bias2_data, out=diff, dtype=np.float32)
+        read_noise_adu = np.std(bias_diff, dtype=np.float64) / np.sqrt(2)
 
         # Convert to electrons
         read_noise_electrons = read_noise_adu * gain
@@ -164,13 +166,16 @@ class CameraCharacterizer:
         )
 
     def _load_fits(self, file_path: str) -> np.ndarray:
-        """Load FITS file and return data array"""
+        """Load FITS file and return its data array, memory-mapped where possible"""
         path = Path(file_path)
 
         if not path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
 
+        # astropy memory-maps unscaled images by default and converts unsigned
+        # 16-bit (BZERO 32768) once to uint16; forcing memmap=True would reject
+        # the scaled files. Consumers widen to float32 as they read it.
         with fits.open(path) as hdul:
             data = hdul[0].data
 
-        return data.astype(float)
+        return data
@@ -2,10 +2,12 @@
 Configuration Service
 Manages application configuration and user state
 """
-import json
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
+import orjson
+
 from app.models.config import AppConfig, UserState, StorageConfig
 
 
@@ -24,16 +26,16 @@ class ConfigService:
     def _load_config(self) -> AppConfig:
         """Load configuration from file"""
         try:
-            with open(self.config_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with open(self.config_file, "rb") as f:
+                data = orjson.loads(f.read())
                 return AppConfig(**data)
-        except (FileNotFoundError, json.JSONDecodeError):
+        except (FileNotFoundError, orjson.JSONDecodeError):
             return AppConfig()
 
     def _save_config(self, config: AppConfig):
         """Save configuration to file"""
-        with open(self.config_file, "w", encoding="utf-8") as f:
-            json.dump(config.model_dump(), f, indent=2, default=str)
+        with open(self.config_file, "wb") as f:
+            f.write(orjson.dumps(config.model_dump(), option=orjson.OPT_INDENT_2, default=str))
 
     def get_config(self) -> AppConfig:
         """Get current configuration"""
@@ -82,3 +84,15 @@ class ConfigService:
     def mark_camera_characterized(self):
         """Mark that camera has been characterized"""
         self.update_user_state(has_characterized_camera=True)
+
+
+@lru_cache(maxsize=1)
+def get_config_service() -> ConfigService:
+    """
+    Get the process-wide ConfigService
+
+    Created on first use rather than at router import, so the config file
+    is only touched once a config route is actually hit. Routers inject it
+    with Depends, which also lets tests swap it via dependency_overrides.
+    """
+    return ConfigService()
@@ -2,18 +2,209 @@
 Service for environmental context: weather APIs and astronomical calculations
 """
 from datetime import datetime, timedelta
-from typing import Optional, List
+from functools import lru_cache
+from typing import Optional, List, Tuple
 import astropy.units as u
 from astropy.time import Time
 from astropy.coordinates import EarthLocation, AltAz, get_sun, SkyCoord, get_body
 import numpy as np
-import requests
+import httpx
 import logging
 
 from app.models.session import GeoLocation, SkyConditions, Ephemeris, AssistantMessage
+from app.utils.http import get_http_client
 
 logger = logging.getLogger(__name__)
 
+# J2000.0 epoch (2000-01-01 12:00 UTC), origin of the solar position formulae
+J2000 = datetime(2000, 1, 1, 12, 0, 0)
+
+# Ephemerides and observer locations kept (observers x nights)
+EPHEMERIS_CACHE_SIZE = 64
+
+# Conditions reported when the weather API can't be used. Validated once here
+# and copied per request (model_copy doesn't re-run validation)
+FALLBACK_CONDITIONS = SkyConditions(
+    seeing=2.5,
+    clouds=30,
+    jet_stream=25.0,
+    transparency=70,
+    humidity=60,
+    wind_speed=5.0,
+    temperature=15.0,
+    source="fallback"
+)
+
+
+def _sun_altitude(start: datetime, hours: np.ndarray, latitude: float, longitude: float) -> np.ndarray:
+    """
+    Geometric altitude of the sun in degrees, `hours` after `start` (UTC)
+
+    Low-precision solar coordinates from the Astronomical Almanac (about
+    0.01 deg over 1950-2050), far below the sampling step used for
+    twilight; astropy's get_sun + AltAz transform gives the same crossings
+    but costs orders of magnitude more.
+    """
+    days = (start - J2000).total_seconds() / 86400 + hours / 24
+
+    mean_longitude = np.radians(280.460 + 0.9856474 * days)
+    mean_anomaly = np.radians(357.528 + 0.9856003 * days)
+    ecliptic_longitude = (
+        mean_longitude
+        + np.radians(1.915) * np.sin(mean_anomaly)
+        + np.radians(0.020) * np.sin(2 * mean_anomaly)
+    )
+    obliquity = np.radians(23.439 - 0.0000004 * days)
+
+    right_ascension = np.arctan2(
+        np.cos(obliquity) * np.sin(ecliptic_longitude), np.cos(ecliptic_longitude)
+    )
+    declination = np.arcsin(np.sin(obliquity) * np.sin(ecliptic_longitude))
+
+    sidereal_time = np.radians(280.46061837 + 360.98564736629 * days + longitude)
+    hour_angle = sidereal_time - right_ascension
+
+    lat = np.radians(latitude)
+    sin_alt = (
+        np.sin(lat) * np.sin(declination)
+        + np.cos(lat) * np.cos(declination) * np.cos(hour_angle)
+    )
+    return np.degrees(np.arcsin(sin_alt))
+
+
+def _first_crossing(altitudes: np.ndarray, level: float, after: Optional[int] = None) -> Optional[int]:
+    """
+    Index of the last sample before `altitudes` crosses `level`
+
+    Only crossings after sample `after` count, when given. The window starts
+    at UTC noon, so the curve is not monotonic around a fixed midpoint and
+    has to be scanned rather than bisected; argmax stops the scan's result
+    at the first change without collecting every crossing.
+
+    Returns:
+        Sample index, or None if there is no such crossing
+    """
+    start = 0 if after is None else after + 1
+    below = altitudes[start:] < level
+    changed = below[1:] != below[:-1]
+    if not changed.size:
+        return None
+    i = int(np.argmax(changed))
+    return start + i if changed[i] else None
+
+
+@lru_cache(maxsize=EPHEMERIS_CACHE_SIZE)
+def _ephemeris(latitude: float, longitude: float, date: datetime) -> Ephemeris:
+    """
+    Ephemeris for an observer and date
+
+    Memoized: the moon's position still goes through astropy, and the same
+    observer and date are asked for again by each step that needs the night.
+    """
+    # Calculate for the evening (start from noon today)
+    noon_today = datetime(date.year, date.month, date.day, 12, 0, 0)
+    hours = np.linspace(0, 24, 1000)
+
+    # Get sun altitudes (degrees)
+    sun_alt = _sun_altitude(noon_today, hours, latitude, longitude)
+
+    # Find sunset (when sun goes below horizon)
+    sunset_idx = _first_crossing(sun_alt, 0)
+    if sunset_idx is not None:
+        sunset_time = noon_today + timedelta(hours=hours[sunset_idx])
+    else:
+        sunset_time = noon_today  # Fallback
+
+    # Find sunrise (when sun rises above horizon after sunset)
+    sunrise_idx = _first_crossing(sun_alt, 0, after=sunset_idx)
+    if sunrise_idx is not None:
+        sunrise_time = noon_today + timedelta(hours=hours[sunrise_idx])
+    else:
+        sunrise_time = noon_today + timedelta(hours=12)  # Fallback
+
+    # Astronomical twilight: sun altitude < -18 degrees
+    astro_twilight_evening_idx = _first_crossing(sun_alt, -18)
+    if astro_twilight_evening_idx is not None:
+        astro_twilight_evening = noon_today + timedelta(hours=hours[astro_twilight_evening_idx])
+    else:
+        astro_twilight_evening = sunset_time + timedelta(hours=1)
+
+    astro_twilight_morning_idx = _first_crossing(sun_alt, -18, after=astro_twilight_evening_idx)
+    if astro_twilight_morning_idx is not None:
+        astro_twilight_morning = noon_today + timedelta(hours=hours[astro_twilight_morning_idx])
+    else:
+        astro_twilight_morning = sunrise_time - timedelta(hours=1)
+
+    # Calculate darkness duration
+    darkness_duration = (astro_twilight_morning - astro_twilight_evening).total_seconds() / 3600
+
+    # Format duration as "Xh Ym"
+    hours = int(darkness_duration)
+    minutes = int((darkness_duration - hours) * 60)
+    darkness_duration_formatted = f"{hours}h {minutes}m"
+
+    # Get moon data
+    moon_time = Time(date)
+    moon = get_body('moon', moon_time)
+    sun = get_sun(moon_time)
+
+    # Calculate moon phase (elongation from sun)
+    elongation = sun.separation(moon).deg
+    moon_phase = (1 - np.cos(np.radians(elongation))) / 2  # 0 = new moon, 1 = full moon
+    moon_illumination = int(moon_phase * 100)
+
+    return Ephemeris(
+        darkness_start=astro_twilight_evening,
+        darkness_end=astro_twilight_morning,
+        darkness_duration=darkness_duration,
+        darkness_duration_formatted=darkness_duration_formatted,
+        moon_phase=moon_phase,
+        moon_illumination=moon_illumination,
+        sun_set=sunset_time,
+        sun_rise=sunrise_time,
+        astronomical_twilight_start=astro_twilight_evening,
+        astronomical_twilight_end=astro_twilight_morning
+    )
+
+
+@lru_cache(maxsize=EPHEMERIS_CACHE_SIZE)
+def _earth_location(latitude: float, longitude: float, elevation: float) -> EarthLocation:
+    """Observer location, built once per site"""
+    return EarthLocation(lat=latitude * u.deg, lon=longitude * u.deg, height=elevation * u.m)
+
+
+@lru_cache(maxsize=EPHEMERIS_CACHE_SIZE)
+def build_altaz_grid(
+    latitude: float,
+    longitude: float,
+    elevation: float,
+    start: datetime,
+    end: datetime,
+    n: int = 100
+) -> Tuple[Time, AltAz]:
+    """
+    Evenly spaced times from start to end and the observer's AltAz frame at them
+
+    Memoized, so every target checked for the same night and observer is
+    transformed into one frame instead of building its own. Transform
+    coordinates of shape (N, 1) to get (N, n) altitudes in one call.
+
+    Args:
+        latitude: Observer latitude in degrees
+        longitude: Observer longitude in degrees
+        elevation: Observer elevation in meters
+        start: First sample time (UTC)
+        end: Last sample time (UTC)
+        n: Number of samples
+
+    Returns:
+        (times, frame)
+    """
+    start_time = Time(start)
+    end_time = Time(end)
+    times = start_time + np.linspace(0, (end_time - start_time).to(u.hour).value, n) * u.hour
+    return times, AltAz(obstime=times, location=_earth_location(latitude, longitude, elevation))
+
 
 class EnvironmentalService:
     """Service for environmental context and ephemeris calculations"""
@@ -35,79 +226,8 @@ class EnvironmentalService:
         if date is None:
             date = datetime.utcnow()
 
-        # Create observer location
-        observer = EarthLocation(
-            lat=location.latitude * u.deg,
-            lon=location.longitude * u.deg,
-            height=(location.elevation or 0) * u.m
-        )
-
-        # Calculate for the evening (start from noon today)
-        noon_today = datetime(date.year, date.month, date.day, 12, 0, 0)
-        times = Time(noon_today) + np.linspace(0, 24, 1000) * u.hour
-
-        # Get sun positions
-        sun_altaz = get_sun(times).transform_to(AltAz(obstime=times, location=observer))
-
-        # Find sunset (when sun goes below horizon)
-        sunset_idx = np.where(np.diff(sun_altaz.alt.deg < 0))[0]
-        if len(sunset_idx) > 0:
-            sunset_time = times[sunset_idx[0]].datetime
-        else:
-            sunset_time = noon_today  # Fallback
-
-        # Find sunrise (when sun rises above horizon after sunset)
-        sunrise_idx = np.where(np.diff(sun_altaz.alt.deg > 0))[0]
-        sunrise_idx = sunrise_idx[sunrise_idx > sunset_idx[0]] if len(sunset_idx) > 0 else sunrise_idx
-        if len(sunrise_idx) > 0:
-            sunrise_time = times[sunrise_idx[0]].datetime
-        else:
-            sunrise_time = noon_today + timedelta(hours=12)  # Fallback
-
-        # Astronomical twilight: sun altitude < -18 degrees
-        astro_twilight_evening_idx = np.where(np.diff(sun_altaz.alt.deg < -18))[0]
-        if len(astro_twilight_evening_idx) > 0:
-            astro_twilight_evening = times[astro_twilight_evening_idx[0]].datetime
-        else:
-            astro_twilight_evening = sunset_time + timedelta(hours=1)
-
-        astro_twilight_morning_idx = np.where(np.diff(sun_altaz.alt.deg > -18))[0]
-        astro_twilight_morning_idx = astro_twilight_morning_idx[astro_twilight_morning_idx > astro_twilight_evening_idx[0]] if len(astro_twilight_evening_idx) > 0 else astro_twilight_morning_idx
-        if len(astro_twilight_morning_idx) > 0:
-            astro_twilight_morning = times[astro_twilight_morning_idx[0]].datetime
-        else:
-            astro_twilight_morning = sunrise_time - timedelta(hours=1)
-
-        # Calculate darkness duration
-        darkness_duration = (astro_twilight_morning - astro_twilight_evening).total_seconds() / 3600
-
-        # Format duration as "Xh Ym"
-        hours = int(darkness_duration)
-        minutes = int((darkness_duration - hours) * 60)
-        darkness_duration_formatted = f"{hours}h {minutes}m"
-
-        # Get moon data
-        moon_time = Time(date)
-        moon = get_body('moon', moon_time)
-        sun = get_sun(moon_time)
-
-        # Calculate moon phase (elongation from sun)
-        elongation = sun.separation(moon).deg
-        moon_phase = (1 - np.cos(np.radians(elongation))) / 2  # 0 = new moon, 1 = full moon
-        moon_illumination = int(moon_phase * 100)
-
-        return Ephemeris(
-            darkness_start=astro_twilight_evening,
-            darkness_end=astro_twilight_morning,
-            darkness_duration=darkness_duration,
-            darkness_duration_formatted=darkness_duration_formatted,
-            moon_phase=moon_phase,
-            moon_illumination=moon_illumination,
-            sun_set=sunset_time,
-            sun_rise=sunrise_time,
-            astronomical_twilight_start=astro_twilight_evening,
-            astronomical_twilight_end=astro_twilight_morning
-        )
+        # Ephemeris is frozen, so the cached instance is safe to share
+        return _ephemeris(location.latitude, location.longitude, date)
 
     def get_sky_conditions(self, location: GeoLocation) -> SkyConditions:
         """
@@ -136,7 +256,7 @@ class EnvironmentalService:
                 "timezone": "auto"
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = get_http_client().get(url, params=params)
             response.raise_for_status()
             data = response.json()
 
@@ -174,30 +294,16 @@ class EnvironmentalService:
                 source="Open-Meteo"
             )
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Failed to retrieve weather data from Open-Meteo: {e}")
             # Return fallback data
-            return SkyConditions(
-                seeing=2.5,
-                clouds=30,
-                jet_stream=25.0,
-                transparency=70,
-                humidity=60,
-                wind_speed=5.0,
-                temperature=15.0,
-                source="fallback"
+            return FALLBACK_CONDITIONS.model_copy(
+                update={"source": "fallback", "timestamp": datetime.utcnow()}
             )
         except Exception as e:
             logger.error(f"Unexpected error in get_sky_conditions: {e}")
-            return SkyConditions(
-                seeing=2.5,
-                clouds=30,
-                jet_stream=25.0,
-                transparency=70,
-                humidity=60,
-                wind_speed=5.0,
-                temperature=15.0,
-                source="error_fallback"
+            return FALLBACK_CONDITIONS.model_copy(
+                update={"source": "error_fallback", "timestamp": datetime.utcnow()}
             )
 
     def generate_recommendations(self, conditions: SkyConditions, ephemeris: Ephemeris) -> AssistantMessage:
@@ -288,21 +394,18 @@ class EnvironmentalService:
         if date is None:
             date = datetime.utcnow()
 
-        observer = EarthLocation(
-            lat=location.latitude * u.deg,
-            lon=location.longitude * u.deg,
-            height=(location.elevation or 0) * u.m
-        )
-
         target = SkyCoord(ra=target_ra * u.deg, dec=target_dec * u.deg, frame='icrs')
 
         # Calculate altitude throughout the night
         ephemeris = self.calculate_ephemeris(location, date)
-        start_time = Time(ephemeris.darkness_start)
-        end_time = Time(ephemeris.darkness_end)
-
-        times = start_time + np.linspace(0, (end_time - start_time).to(u.hour).value, 100) * u.hour
-        altaz = target.transform_to(AltAz(obstime=times, location=observer))
+        times, frame = build_altaz_grid(
+            location.latitude,
+            location.longitude,
+            location.elevation or 0,
+            ephemeris.darkness_start,
+            ephemeris.darkness_end
+        )
+        altaz = target.transform_to(frame)
 
         max_alt = np.max(altaz.alt.deg)
         max_alt_time = times[np.argmax(altaz.alt.deg)].datetime
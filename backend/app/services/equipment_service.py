@@ -4,6 +4,7 @@ Manages CRUD operations for equipment profiles
 """
 import json
 import uuid
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional
 from datetime import datetime
@@ -54,6 +55,7 @@ class EquipmentService:
         is_first = len(profiles) == 0
 
         # Create new profile
+        now = datetime.now()
         profile = EquipmentProfile(
             id=str(uuid.uuid4()),
             name=profile_data.name,
@@ -64,8 +66,8 @@ class EquipmentService:
             filters=profile_data.filters,
             default_location=profile_data.default_location,
             is_active=is_first,  # Auto-activate if first profile
-            created_at=datetime.now(),
-            updated_at=datetime.now()
+            created_at=now,
+            updated_at=now
         )
 
         profiles.append(profile)
@@ -145,3 +147,14 @@ class EquipmentService:
         """Set a profile as active"""
         update_data = EquipmentUpdate(is_active=True)
         return self.update_profile(profile_id, update_data)
+
+
+@lru_cache(maxsize=1)
+def get_equipment_service() -> EquipmentService:
+    """
+    Get the process-wide EquipmentService
+
+    Created on first use rather than at router import, so profiles.json is
+    only touched once an equipment route is hit.
+    """
+    return EquipmentService()
@@ -14,6 +14,12 @@ from app.models.session import (
     ScoutAnalysis
 )
 
+# Allocation order when building the plan; sets for membership tests
+NARROWBAND_ORDER = ("H-alpha", "OIII", "SII")
+BROADBAND_ORDER = ("L", "R", "G", "B")
+NARROWBAND_FILTERS = frozenset(NARROWBAND_ORDER)
+BROADBAND_FILTERS = frozenset(BROADBAND_ORDER)
+
 
 class FlightPlanGenerator:
     """
@@ -89,8 +95,12 @@ class FlightPlanGenerator:
         )
 
     def export_asiair(self, plan: AcquisitionPlan, output_path: str):
+        """Export plan to an ASIAIR .plan file"""
+        Path(output_path).write_bytes(self.render_asiair(plan))
+
+    def render_asiair(self, plan: AcquisitionPlan) -> bytes:
         """
-        Export plan to ASIAIR .plan format
+        Render plan in ASIAIR .plan format
 
         ASIAIR format is a JSON file with specific structure
         """
@@ -137,13 +147,15 @@ class FlightPlanGenerator:
             "count": plan.bias.count
         })
 
-        # Save to file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(asiair_plan, f, indent=2)
+        return json.dumps(asiair_plan, indent=2).encode('utf-8')
 
     def export_nina(self, plan: AcquisitionPlan, output_path: str):
+        """Export plan to a N.I.N.A. JSON file"""
+        Path(output_path).write_bytes(self.render_nina(plan))
+
+    def render_nina(self, plan: AcquisitionPlan) -> bytes:
         """
-        Export plan to N.I.N.A. JSON format
+        Render plan in N.I.N.A. JSON format
 
         N.I.N.A. uses a different structure for sequences
         """
@@ -173,9 +185,7 @@ class FlightPlanGenerator:
                 "ExposureCount": item.count
             })
 
-        # Save to file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(nina_plan, f, indent=2)
+        return json.dumps(nina_plan, indent=2).encode('utf-8')
 
     def _generate_lights_plan(
         self,
@@ -194,8 +204,8 @@ class FlightPlanGenerator:
         lights = {}
 
         # Determine which filters to use
-        use_narrowband = any(f in target.optimal_filters for f in ["H-alpha", "OIII", "SII"])
-        use_broadband = any(f in target.optimal_filters for f in ["L", "R", "G", "B"])
+        use_narrowband = not NARROWBAND_FILTERS.isdisjoint(target.optimal_filters)
+        use_broadband = not BROADBAND_FILTERS.isdisjoint(target.optimal_filters)
 
         available_minutes = available_hours * 60
 
@@ -212,7 +222,7 @@ class FlightPlanGenerator:
 
         # Narrowband allocation
         if use_narrowband and nb_time > 0:
-            nb_filters = [f for f in ["H-alpha", "OIII", "SII"] if f in target.optimal_filters]
+            nb_filters = [f for f in NARROWBAND_ORDER if f in target.optimal_filters]
             time_per_filter = nb_time / len(nb_filters)
 
             for filter_name in nb_filters:
@@ -229,7 +239,7 @@ class FlightPlanGenerator:
 
         # Broadband allocation
         if use_broadband and bb_time > 0:
-            bb_filters = [f for f in ["L", "R", "G", "B"] if f in target.optimal_filters]
+            bb_filters = [f for f in BROADBAND_ORDER if f in target.optimal_filters]
             time_per_filter = bb_time / len(bb_filters)
 
             for filter_name in bb_filters:
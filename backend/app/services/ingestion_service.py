@@ -12,6 +12,8 @@ from app.utils.directory import DirectoryManager
 
 logger = logging.getLogger(__name__)
 
+CALIBRATION_TYPES = frozenset({"Dark", "Flat", "Bias"})
+
 
 class IngestionService:
     """Service for ingesting and organizing astrophotography files"""
@@ -88,7 +90,7 @@ class IngestionService:
             raise FileNotFoundError(f"File not found: {source_path}")
 
         # Determine destination based on image type
-        if metadata.image_type in ["Dark", "Flat", "Bias"]:
+        if metadata.image_type in CALIBRATION_TYPES:
             # Calibration frame
             dest_path = self._get_calibration_dest(metadata, session_name)
         elif metadata.image_type == "Light":
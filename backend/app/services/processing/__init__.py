@@ -5,7 +5,7 @@ from .calibrator import ScienceFrameCalibrator
 from .quality_analyzer import QualityAnalyzer
 from .registrar import ImageRegistrar
 from .stacker import ImageStacker
-from .pipeline_service import PipelineService
+from .pipeline_service import PipelineService, shared_pipeline_service
 
 __all__ = [
     "ScienceFrameCalibrator",
@@ -13,4 +13,5 @@ __all__ = [
     "ImageRegistrar",
     "ImageStacker",
     "PipelineService",
+    "shared_pipeline_service",
 ]
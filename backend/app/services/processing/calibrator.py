@@ -3,9 +3,11 @@ Science frame calibration service
 """
 import logging
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import numpy as np
 
+from app.utils.prefetch import iter_prefetched
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,6 +16,36 @@ class ScienceFrameCalibrator:
     Applies master calibration frames to science frames.
     """
 
+    @staticmethod
+    def _read_ccd(path: str, roi: Optional[Tuple[int, int, int, int]] = None):
+        """
+        Read a frame as CCDData, optionally only a region of it.
+
+        Args:
+            path: FITS file path
+            roi: Region (x0, y0, x1, y1) in pixels; whole frame if None
+
+        Returns:
+            CCDData in ADU
+        """
+        from astropy.io import fits
+        from astropy.nddata import CCDData
+
+        with fits.open(path) as hdul:
+            # Compressed masters keep the image in the first extension
+            # behind an empty primary
+            index = 1 if len(hdul) > 1 and not hdul[0].header.get('NAXIS') else 0
+
+            if roi is not None:
+                # HDU.section reads just the requested window from disk
+                # instead of materializing the full frame
+                x0, y0, x1, y1 = roi
+                data = hdul[index].section[y0:y1, x0:x1]
+                header = hdul[index].header.copy()
+                return CCDData(data, unit='adu', header=header)
+
+        return CCDData.read(path, unit='adu', hdu=index)
+
     @staticmethod
     def calibrate_frame(
         science_path: str,
@@ -22,6 +54,7 @@ class ScienceFrameCalibrator:
         master_dark_path: Optional[str] = None,
         master_flat_path: Optional[str] = None,
         dark_scale: bool = True,
+        roi: Optional[Tuple[int, int, int, int]] = None,
     ) -> Dict[str, Any]:
         """
         Calibrate a science frame using master calibration frames.
@@ -33,6 +66,8 @@ class ScienceFrameCalibrator:
             master_dark_path: Path to master dark (optional)
             master_flat_path: Path to master flat (optional)
             dark_scale: Whether to scale dark by exposure time
+            roi: Region (x0, y0, x1, y1) to calibrate; whole frame if None.
+                Masters are cut to the same region.
 
         Returns:
             Dictionary with calibration statistics
@@ -50,21 +85,21 @@ class ScienceFrameCalibrator:
             logger.info(f"Calibrating: {science_path}")
 
             # Load science frame
-            science = CCDData.read(science_path, unit='adu')
+            science = ScienceFrameCalibrator._read_ccd(science_path, roi)
             calibrated = science.copy()
 
             steps_applied = []
 
             # Subtract bias
             if master_bias_path:
-                master_bias = CCDData.read(master_bias_path, unit='adu')
+                master_bias = ScienceFrameCalibrator._read_ccd(master_bias_path, roi)
                 calibrated = subtract_bias(calibrated, master_bias)
                 steps_applied.append("bias_subtraction")
                 logger.debug("Applied bias subtraction")
 
             # Subtract dark
             if master_dark_path:
-                master_dark = CCDData.read(master_dark_path, unit='adu')
+                master_dark = ScienceFrameCalibrator._read_ccd(master_dark_path, roi)
 
                 if dark_scale:
                     # Scale dark by exposure time ratio
@@ -95,7 +130,7 @@ class ScienceFrameCalibrator:
 
             # Flat field correction
             if master_flat_path:
-                master_flat = CCDData.read(master_flat_path, unit='adu')
+                master_flat = ScienceFrameCalibrator._read_ccd(master_flat_path, roi)
                 calibrated = flat_correct(calibrated, master_flat)
                 steps_applied.append("flat_correction")
                 logger.debug("Applied flat correction")
@@ -114,6 +149,8 @@ class ScienceFrameCalibrator:
                 calibrated.header['MDARK'] = (Path(master_dark_path).name, 'Master dark used')
             if master_flat_path:
                 calibrated.header['MFLAT'] = (Path(master_flat_path).name, 'Master flat used')
+            if roi:
+                calibrated.header['CALROI'] = (','.join(map(str, roi)), 'Calibrated region x0,y0,x1,y1')
 
             calibrated.write(str(output_path_obj), overwrite=True)
             logger.info(f"Calibrated frame saved: {output_path_obj}")
@@ -126,6 +163,7 @@ class ScienceFrameCalibrator:
                 "master_bias": master_bias_path,
                 "master_dark": master_dark_path,
                 "master_flat": master_flat_path,
+                "roi": list(roi) if roi else None,
                 "mean": float(np.mean(calibrated.data)),
                 "median": float(np.median(calibrated.data)),
                 "std": float(np.std(calibrated.data)),
@@ -148,6 +186,7 @@ class ScienceFrameCalibrator:
         master_dark_path: Optional[str] = None,
         master_flat_path: Optional[str] = None,
         dark_scale: bool = True,
+        roi: Optional[Tuple[int, int, int, int]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Calibrate multiple science frames.
@@ -159,6 +198,7 @@ class ScienceFrameCalibrator:
             master_dark_path: Path to master dark
             master_flat_path: Path to master flat
             dark_scale: Whether to scale dark
+            roi: Region (x0, y0, x1, y1) to calibrate; whole frames if None
 
         Returns:
             List of calibration statistics for each frame
@@ -168,7 +208,7 @@ class ScienceFrameCalibrator:
 
         results = []
 
-        for science_path in science_paths:
+        for science_path in iter_prefetched(science_paths):
             try:
                 # Generate output filename
                 input_name = Path(science_path).stem
@@ -182,6 +222,7 @@ class ScienceFrameCalibrator:
                     master_dark_path=master_dark_path,
                     master_flat_path=master_flat_path,
                     dark_scale=dark_scale,
+                    roi=roi,
                 )
 
                 results.append({"success": True, "stats": stats})
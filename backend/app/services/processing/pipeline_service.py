@@ -5,14 +5,16 @@ import json
 import logging
 import uuid
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Literal
+from typing import List, Dict, Any, Optional, Literal, Tuple
 
 from app.models.pipeline import ProcessingPipeline, ProcessingStep
 from app.services.processing.calibrator import ScienceFrameCalibrator
 from app.services.processing.quality_analyzer import QualityAnalyzer
 from app.services.processing.registrar import ImageRegistrar
 from app.services.processing.stacker import ImageStacker
+from app.utils.responses import file_etag
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +48,10 @@ class PipelineService:
             logger.error(f"Error reading metadata: {e}")
             return {"pipelines": []}
 
+    def metadata_etag(self) -> str:
+        """ETag identifying the current version of the pipelines metadata"""
+        return file_etag(self.metadata_file)
+
     def _write_metadata(self, data: dict):
         """Write pipelines metadata to file"""
         try:
@@ -72,6 +78,7 @@ class PipelineService:
             Created ProcessingPipeline
         """
         pipeline_id = str(uuid.uuid4())
+        now = datetime.now()
 
         pipeline = ProcessingPipeline(
             id=pipeline_id,
@@ -81,8 +88,8 @@ class PipelineService:
             panels=panels,
             steps=[],
             status="pending",
-            created_at=datetime.now(),
-            updated_at=datetime.now(),
+            created_at=now,
+            updated_at=now,
         )
 
         metadata = self._read_metadata()
@@ -92,17 +99,32 @@ class PipelineService:
         logger.info(f"Created pipeline: {object_name} (ID: {pipeline_id})")
         return pipeline
 
+    @staticmethod
+    def _pipeline_from_metadata(data: dict) -> ProcessingPipeline:
+        """
+        Rebuild a pipeline from persisted metadata without re-validation.
+
+        The metadata file is only written from validated models, so nested
+        steps and timestamps are reconstructed directly.
+        """
+        return ProcessingPipeline.model_construct(**{
+            **data,
+            "steps": [ProcessingStep.model_construct(**s) for s in data.get("steps", [])],
+            "created_at": datetime.fromisoformat(data["created_at"]),
+            "updated_at": datetime.fromisoformat(data["updated_at"]),
+        })
+
     def get_pipelines(self) -> List[ProcessingPipeline]:
         """Get all pipelines"""
         metadata = self._read_metadata()
-        return [ProcessingPipeline(**p) for p in metadata["pipelines"]]
+        return [self._pipeline_from_metadata(p) for p in metadata["pipelines"]]
 
     def get_pipeline(self, pipeline_id: str) -> Optional[ProcessingPipeline]:
         """Get a pipeline by ID"""
         metadata = self._read_metadata()
         for p in metadata["pipelines"]:
             if p["id"] == pipeline_id:
-                return ProcessingPipeline(**p)
+                return self._pipeline_from_metadata(p)
         return None
 
     def _update_pipeline(self, pipeline: ProcessingPipeline):
@@ -124,6 +146,7 @@ class PipelineService:
         master_bias_path: Optional[str] = None,
         master_dark_path: Optional[str] = None,
         master_flat_path: Optional[str] = None,
+        roi: Optional[Tuple[int, int, int, int]] = None,
     ) -> Dict[str, Any]:
         """
         Execute calibration step.
@@ -134,6 +157,7 @@ class PipelineService:
             master_bias_path: Master bias path
             master_dark_path: Master dark path
             master_flat_path: Master flat path
+            roi: Region (x0, y0, x1, y1) to calibrate; whole frames if None
 
         Returns:
             Results dictionary
@@ -154,6 +178,7 @@ class PipelineService:
             master_bias_path=master_bias_path,
             master_dark_path=master_dark_path,
             master_flat_path=master_flat_path,
+            roi=roi,
         )
 
         # Update pipeline
@@ -279,7 +304,7 @@ class PipelineService:
             raise ValueError(f"Pipeline not found: {pipeline_id}")
 
         # Output directory
-        output_dir = self.project_path / "02_processed_data" / "science" / pipeline.object_name / "stacked"
+        output_dir = self._stacked_dir(pipeline)
 
         logger.info(f"Executing stacking for {len(file_paths)} frames")
 
@@ -304,6 +329,32 @@ class PipelineService:
             "results": results,
         }
 
+    def get_stacked_image(self, pipeline_id: str, filter_name: str) -> Optional[Path]:
+        """
+        Get the stacked image produced for one filter.
+
+        Args:
+            pipeline_id: Pipeline ID
+            filter_name: Filter name (FILTER header of the stacked frames)
+
+        Returns:
+            Path to the stacked FITS, or None if that filter hasn't been stacked
+        """
+        pipeline = self.get_pipeline(pipeline_id)
+        if not pipeline:
+            raise ValueError(f"Pipeline not found: {pipeline_id}")
+
+        # Filter names come from the URL; refuse anything that isn't a plain name
+        if Path(filter_name).name != filter_name:
+            return None
+
+        path = self._stacked_dir(pipeline) / f"stacked_{filter_name}.fits"
+        return path if path.is_file() else None
+
+    def _stacked_dir(self, pipeline: ProcessingPipeline) -> Path:
+        """Directory holding a pipeline's stacked outputs"""
+        return self.project_path / "02_processed_data" / "science" / pipeline.object_name / "stacked"
+
     def delete_pipeline(self, pipeline_id: str) -> bool:
         """
         Delete a pipeline.
@@ -324,3 +375,14 @@ class PipelineService:
                 return True
 
         return False
+
+
+@lru_cache(maxsize=256)
+def shared_pipeline_service(project_path: str) -> PipelineService:
+    """
+    Get the process-wide PipelineService for a project directory
+
+    Call shared_pipeline_service.cache_clear() when projects are deleted, since
+    the cached service assumes its processed data directory exists.
+    """
+    return PipelineService(project_path)
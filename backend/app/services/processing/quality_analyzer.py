@@ -2,9 +2,13 @@
 Image quality analysis service
 """
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 import numpy as np
 
+from app.utils.prefetch import iter_prefetched
+
 logger = logging.getLogger(__name__)
 
 
@@ -109,19 +113,26 @@ class QualityAnalyzer:
         Returns:
             List of quality metrics dictionaries
         """
-        results = []
-
-        for file_path in file_paths:
+        def analyze(file_path: str) -> Dict[str, Any]:
             try:
-                metrics = QualityAnalyzer.analyze_frame(file_path, threshold_sigma)
-                results.append(metrics)
+                return QualityAnalyzer.analyze_frame(file_path, threshold_sigma)
             except Exception as e:
                 logger.error(f"Failed to analyze {file_path}: {e}")
-                results.append({
+                return {
                     "file": file_path,
                     "error": str(e),
                     "star_count": 0,
-                })
+                }
+
+        # Frames are independent and the FITS reads, sigma clipping and star
+        # finding release the GIL, so spread them over the cores. On a single
+        # core, threads only add contention; keep the sequential read-ahead loop
+        workers = min(os.cpu_count() or 1, len(file_paths))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(analyze, file_paths))
+        else:
+            results = [analyze(file_path) for file_path in iter_prefetched(file_paths)]
 
         logger.info(f"Analyzed {len(results)} frames")
         return results
@@ -2,13 +2,37 @@
 Image registration/alignment service
 """
 import logging
+import os
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import numpy as np
 
+from app.utils.prefetch import iter_prefetched
+
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4)
+def _load_reference(path: str, mtime_ns: int) -> np.ndarray:
+    """
+    Load a reference frame's pixels as float, shared across frames and calls
+
+    Keyed on the file's mtime so a reference rewritten on disk is reloaded.
+    The array is read-only since every caller gets the same instance.
+    """
+    from astropy.nddata import CCDData
+
+    data = CCDData.read(path).data.astype(float)
+    data.flags.writeable = False
+    return data
+
+
+def load_reference(path: str) -> np.ndarray:
+    """Get a reference frame's pixels, reusing the cached copy while the file is unchanged"""
+    return _load_reference(path, os.stat(path).st_mtime_ns)
+
+
 class ImageRegistrar:
     """
     Aligns/registers images using star matching (Astroalign).
@@ -40,24 +64,22 @@ class ImageRegistrar:
 
             logger.info(f"Registering {Path(source_path).name} to reference")
 
-            # Load images
+            # Load images (the reference is usually shared by the whole batch)
             source = CCDData.read(source_path)
-            reference = CCDData.read(reference_path)
+            source_data = source.data.astype(float)
+            reference_data = load_reference(reference_path)
 
-            # Register (align) source to reference
+            # Register (align) source to reference; the transform is found
+            # once and applied, as aa.register would do internally
             try:
-                registered_data, footprint = aa.register(
-                    source.data.astype(float),
-                    reference.data.astype(float),
-                    detection_sigma=detection_sigma
-                )
-
-                # Get transformation info
                 transf, (source_list, ref_list) = aa.find_transform(
-                    source.data.astype(float),
-                    reference.data.astype(float),
+                    source_data,
+                    reference_data,
                     detection_sigma=detection_sigma
                 )
+                registered_data, footprint = aa.apply_transform(
+                    transf, source_data, reference_data
+                )
 
                 num_matches = len(source_list)
                 logger.info(f"Registration successful: {num_matches} control points")
@@ -127,7 +149,7 @@ class ImageRegistrar:
 
         results = []
 
-        for source_path in source_paths:
+        for source_path in iter_prefetched(source_paths):
             try:
                 # Skip if source is the reference
                 if Path(source_path).resolve() == Path(reference_path).resolve():
@@ -6,9 +6,37 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional, Literal
 import numpy as np
 
+try:
+    from bottleneck import nanmedian, nanmean, nansum
+except ImportError:
+    from numpy import nanmean, nansum
+    from app.utils.nanstats import nanmedian
+
+from app.utils.nanstats import nan_sigma
+from app.utils.prefetch import iter_prefetched
+
 logger = logging.getLogger(__name__)
 
 
+def _sum_combine(combiner, ccd_list):
+    # Plain sum of every frame, ignoring rejection (as it always has); reduces
+    # the stack the combiner already holds instead of building another copy
+    from astropy.nddata import CCDData
+
+    stacked_data = nansum(combiner.data_arr.data, axis=0)
+    return CCDData(data=stacked_data, unit=ccd_list[0].unit, header=ccd_list[0].header)
+
+
+# Stacking method -> combine call, each with its reducer bound up front
+_COMBINE = {
+    "median": lambda combiner, ccd_list: combiner.median_combine(
+        median_func=nanmedian, uncertainty_func=nan_sigma
+    ),
+    "average": lambda combiner, ccd_list: combiner.average_combine(scale_func=nanmean),
+    "sum": _sum_combine,
+}
+
+
 class ImageStacker:
     """
     Stacks/integrates multiple aligned images.
@@ -49,12 +77,15 @@ class ImageStacker:
 
             if not file_paths:
                 raise ValueError("No files provided for stacking")
+            combine = _COMBINE.get(method)
+            if combine is None:
+                raise ValueError(f"Invalid stacking method: {method}")
 
             logger.info(f"Stacking {len(file_paths)} images using {method}")
 
             # Load all images
             ccd_list = []
-            for file_path in file_paths:
+            for file_path in iter_prefetched(file_paths):
                 try:
                     ccd = CCDData.read(file_path, unit='adu')
                     ccd_list.append(ccd)
@@ -73,7 +104,7 @@ class ImageStacker:
                 combiner.sigma_clipping(
                     low_thresh=sigma_low,
                     high_thresh=sigma_high,
-                    func=np.ma.median
+                    func="median"
                 )
                 logger.debug(f"Applied sigma clipping: low={sigma_low}, high={sigma_high}")
 
@@ -82,17 +113,7 @@ class ImageStacker:
                 logger.debug(f"Applied minmax clipping: min={minmax_min}, max={minmax_max}")
 
             # Stack images
-            if method == "median":
-                stacked = combiner.median_combine()
-            elif method == "average":
-                stacked = combiner.average_combine()
-            elif method == "sum":
-                # Sum is not directly available in CCDProc, use numpy
-                data_stack = np.array([ccd.data for ccd in ccd_list])
-                stacked_data = np.sum(data_stack, axis=0)
-                stacked = CCDData(data=stacked_data, unit=ccd_list[0].unit, header=ccd_list[0].header)
-            else:
-                raise ValueError(f"Invalid stacking method: {method}")
+            stacked = combine(combiner, ccd_list)
 
             # Update header with stacking info
             stacked.header['STACKED'] = (True, 'Image is a stack')
@@ -5,11 +5,13 @@ import json
 import logging
 import uuid
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from app.models.project import Project, ProjectCreate, ProjectUpdate
 from app.utils.directory import DirectoryManager
+from app.utils.responses import file_etag
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +29,8 @@ class ProjectService:
         self.base_dir = Path(projects_base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
         self.metadata_file = self.base_dir / ".projects.json"
+        # (mtime_ns, size) of the metadata file -> projects by ID
+        self._index: Optional[Tuple[Tuple[int, int], Dict[str, dict]]] = None
         self._ensure_metadata_file()
 
     def _ensure_metadata_file(self):
@@ -42,8 +46,25 @@ class ProjectService:
             logger.error(f"Error reading metadata: {e}")
             return {"projects": []}
 
+    def _project_index(self) -> Dict[str, dict]:
+        """
+        Projects by ID, re-read only when the metadata file changes on disk
+        """
+        stat = self.metadata_file.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        index = self._index
+        if index is None or index[0] != key:
+            index = (key, {p["id"]: p for p in self._read_metadata()["projects"]})
+            self._index = index
+        return index[1]
+
+    def metadata_etag(self) -> str:
+        """ETag identifying the current version of the projects metadata"""
+        return file_etag(self.metadata_file)
+
     def _write_metadata(self, data: dict):
         """Write projects metadata to file"""
+        self._index = None
         try:
             self.metadata_file.write_text(json.dumps(data, indent=2, default=str))
         except Exception as e:
@@ -119,11 +140,8 @@ class ProjectService:
         Returns:
             Project if found, None otherwise
         """
-        metadata = self._read_metadata()
-        for p in metadata["projects"]:
-            if p["id"] == project_id:
-                return Project(**p)
-        return None
+        p = self._project_index().get(project_id)
+        return Project(**p) if p else None
 
     def get_project_by_name(self, name: str) -> Optional[Project]:
         """
@@ -227,3 +245,14 @@ class ProjectService:
             return False
 
         return DirectoryManager.validate_project_structure(project.path)
+
+
+@lru_cache(maxsize=None)
+def shared_project_service(projects_base_dir: str) -> ProjectService:
+    """
+    Get the process-wide ProjectService for a base directory
+
+    The service keeps no per-request state, so routers share one instance
+    instead of re-checking the metadata file on every request.
+    """
+    return ProjectService(projects_base_dir)
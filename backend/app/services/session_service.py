@@ -1,11 +1,16 @@
 """
 Service for managing observing sessions
 """
-import json
+import os
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple, Union
+import msgspec
+from pydantic_core import to_json
 from app.models.session import (
     ObservingSession,
     SessionCreate,
@@ -16,13 +21,41 @@ from app.models.session import (
 )
 
 
+class _Named(msgspec.Struct):
+    """Nested object of which only the name is listed"""
+    name: Optional[str] = None
+
+
+class _SessionSummary(msgspec.Struct):
+    """Fields of a stored session needed for listing; everything else is skipped while decoding"""
+    id: str
+    name: str
+    date: datetime
+    status: str
+    created_at: datetime
+    target: Optional[_Named] = None
+    location: Optional[_Named] = None
+
+
+_SUMMARY_DECODER = msgspec.json.Decoder(_SessionSummary)
+
+
 class SessionService:
     """Service for CRUD operations on observing sessions"""
 
-    def __init__(self, base_dir: str = "./data/sessions"):
+    def __init__(self, base_dir: str = "./data/sessions", cache_size: int = 256):
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
 
+        # Sessions by id with the file version (mtime, size) they were read or
+        # written at: the parsed model, or the bytes just saved (parsed on the
+        # next read). A request typically reads the same session three times
+        # (route, update, message); the version check keeps other workers'
+        # writes visible
+        self._cache: "OrderedDict[str, Tuple[Tuple[int, int], Union[bytes, ObservingSession]]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+
     def _get_session_file(self, session_id: str) -> Path:
         """Get path to session metadata file"""
         return self.base_dir / f"{session_id}.json"
@@ -30,22 +63,24 @@ class SessionService:
     def create_session(self, session_data: SessionCreate) -> ObservingSession:
         """Create a new observing session"""
         session_id = str(uuid.uuid4())
+        now = datetime.utcnow()
 
         session = ObservingSession(
             id=session_id,
             name=session_data.name,
-            date=session_data.date or datetime.utcnow(),
+            date=session_data.date or now,
             location=session_data.location,
             equipment_profile_id=session_data.equipment_profile_id,
-            status=SessionStatus.CREATED,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
+            status="created",
+            created_at=now,
+            updated_at=now
         )
 
         # Add welcome message
         welcome_msg = AssistantMessage(
             step="created",
             message=f"Sesión '{session_data.name}' creada. Empecemos analizando las condiciones de observación.",
+            timestamp=now
         )
         session.messages.append(welcome_msg)
 
@@ -58,30 +93,48 @@ class SessionService:
         """Get session by ID"""
         session_file = self._get_session_file(session_id)
 
-        if not session_file.exists():
+        try:
+            version = _file_version(session_file.stat())
+        except FileNotFoundError:
+            self._forget(session_id)
             return None
 
-        with open(session_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        return ObservingSession(**data)
+        entry = None
+        with self._cache_lock:
+            cached = self._cache.get(session_id)
+            if cached is not None and cached[0] == version:
+                self._cache.move_to_end(session_id)
+                entry = cached[1]
+
+        if entry is None:
+            entry = session_file.read_bytes()
+        if isinstance(entry, bytes):
+            # Parse and validate the nested session tree in one pydantic-core
+            # pass, without building an intermediate dict
+            entry = ObservingSession.model_validate_json(entry)
+            self._remember(session_id, version, entry)
+
+        # Shallow copy: callers may reassign fields, but the service never
+        # mutates nested values in place
+        return entry.model_copy()
 
     def list_sessions(self) -> List[SessionListItem]:
         """List all sessions"""
         sessions = []
 
         for session_file in self.base_dir.glob("*.json"):
-            with open(session_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            # Sessions carry messages, plans and analyses; decode only the
+            # summary fields instead of materializing the whole document
+            data = _SUMMARY_DECODER.decode(session_file.read_bytes())
 
             session_item = SessionListItem(
-                id=data["id"],
-                name=data["name"],
-                date=data["date"],
-                status=data["status"],
-                target_name=data.get("target", {}).get("name") if data.get("target") else None,
-                location_name=data.get("location", {}).get("name") if data.get("location") else None,
-                created_at=data["created_at"]
+                id=data.id,
+                name=data.name,
+                date=data.date,
+                status=data.status,
+                target_name=data.target.name if data.target else None,
+                location_name=data.location.name if data.location else None,
+                created_at=data.created_at
             )
             sessions.append(session_item)
 
@@ -97,16 +150,40 @@ class SessionService:
         if not session:
             return None
 
-        # Update fields
-        update_dict = update_data.dict(exclude_unset=True)
+        _apply_update(session, update_data)
+        session.updated_at = datetime.utcnow()
+
+        # Save updated session
+        self._save_session(session)
+
+        return session
+
+    def update_with_message(
+        self,
+        session_id: str,
+        update_data: SessionUpdate,
+        step: str,
+        message: str,
+        data: Optional[dict] = None
+    ) -> Optional[ObservingSession]:
+        """
+        Update session data and add an assistant message in one write
+
+        Same result as update_session followed by add_message, with a single
+        read and save of the session file.
+        """
+        session = self.get_session(session_id)
 
-        for field, value in update_dict.items():
-            if value is not None:
-                setattr(session, field, value)
+        if not session:
+            return None
 
+        _apply_update(session, update_data)
+        session.messages = [
+            *session.messages,
+            AssistantMessage(step=step, message=message, data=data)
+        ]
         session.updated_at = datetime.utcnow()
 
-        # Save updated session
         self._save_session(session)
 
         return session
@@ -119,6 +196,7 @@ class SessionService:
             return False
 
         session_file.unlink()
+        self._forget(session_id)
         return True
 
     def add_message(self, session_id: str, step: str, message: str, data: Optional[dict] = None) -> Optional[ObservingSession]:
@@ -133,7 +211,7 @@ class SessionService:
             message=message,
             data=data
         )
-        session.messages.append(assistant_msg)
+        session.messages = [*session.messages, assistant_msg]
         session.updated_at = datetime.utcnow()
 
         self._save_session(session)
@@ -150,8 +228,8 @@ class SessionService:
         session.status = status
         session.updated_at = datetime.utcnow()
 
-        if status == SessionStatus.COMPLETED:
-            session.completed_at = datetime.utcnow()
+        if status == "completed":
+            session.completed_at = session.updated_at
 
         self._save_session(session)
 
@@ -161,5 +239,57 @@ class SessionService:
         """Save session to disk"""
         session_file = self._get_session_file(session.id)
 
-        with open(session_file, "w", encoding="utf-8") as f:
-            json.dump(session.dict(), f, indent=2, default=str)
+        # Serialize before truncating the file. Message data may hold numpy
+        # scalars from the services, stored as strings as json.dump(default=str) did.
+        # Compact: sessions are only read back by this service, and indenting
+        # made every write ~30% larger
+        data = to_json(session, fallback=str)
+        try:
+            with open(session_file, "wb") as f:
+                f.write(data)
+                f.flush()
+                version = _file_version(os.fstat(f.fileno()))
+        except BaseException:
+            self._forget(session.id)
+            raise
+
+        # Cache what was written rather than the object itself, which may
+        # still hold values (numpy scalars) that only the stored form normalizes
+        self._remember(session.id, version, data)
+
+    def _remember(self, session_id: str, version: Tuple[int, int], entry: Union[bytes, ObservingSession]):
+        """Cache a parsed or just saved session"""
+        with self._cache_lock:
+            self._cache[session_id] = (version, entry)
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _forget(self, session_id: str):
+        """Drop a session from the cache"""
+        with self._cache_lock:
+            self._cache.pop(session_id, None)
+
+
+def _apply_update(session: ObservingSession, update_data: SessionUpdate):
+    # Reuse the already validated nested models rather than dumping them to dicts
+    for field in update_data.model_fields_set:
+        value = getattr(update_data, field)
+        if value is not None:
+            setattr(session, field, value)
+
+
+def _file_version(stat: os.stat_result) -> Tuple[int, int]:
+    # mtime alone can repeat for writes within one filesystem clock tick
+    return stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=1)
+def get_session_service() -> SessionService:
+    """
+    Get the process-wide SessionService
+
+    Created on first use rather than at router import, so the sessions
+    directory is only touched once a session route is hit.
+    """
+    return SessionService()
@@ -7,7 +7,6 @@ from typing import Dict, Optional
 import numpy as np
 from astropy.io import fits
 from astropy.stats import sigma_clipped_stats
-from photutils.detection import DAOStarFinder
 
 from app.models.session import ScoutAnalysis, SensorProfile
 
@@ -185,6 +184,10 @@ class SmartScout:
             (fwhm, star_count)
         """
         try:
+            # Imported here: photutils (and the dask stack it pulls in) is only
+            # needed once a scout frame is analyzed, not at server startup
+            from photutils.detection import DAOStarFinder
+
             # Calculate background for star detection
             mean, median, std = sigma_clipped_stats(data, sigma=3.0)
 
@@ -2,15 +2,28 @@
 Service for intelligent target selection (Step 3)
 """
 import json
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional, Tuple
 from datetime import datetime
 import numpy as np
-from astropy.time import Time
-from astropy.coordinates import EarthLocation, AltAz, SkyCoord
+from astropy.coordinates import SkyCoord
 import astropy.units as u
 
 from app.models.session import CelestialTarget, GeoLocation, Ephemeris, FOVSimulation
+from app.services.environmental_service import build_altaz_grid
+
+NARROWBAND_FILTERS = frozenset({"H-alpha", "OIII", "SII"})
+BROADBAND_FILTERS = frozenset({"L", "R", "G", "B"})
+
+# Visibility results kept (catalog targets x nights x locations)
+VISIBILITY_CACHE_SIZE = 4096
+
+# Whole-catalog visibility results kept (nights x locations)
+CATALOG_VISIBILITY_CACHE_SIZE = 64
+
+# Altitude samples taken across the night's darkness
+VISIBILITY_SAMPLES = 50
 
 
 class TargetSelector:
@@ -32,6 +45,17 @@ class TargetSelector:
         self.catalog_path = Path(catalog_path)
         self.catalog = self._load_catalog()
 
+        # Lookup keys computed once instead of on every search
+        self._search_keys = [
+            (target.name.lower(), target.catalog_id.lower(), target)
+            for target in self.catalog
+        ]
+        self._by_catalog_id = {}
+        for target in self.catalog:
+            self._by_catalog_id.setdefault(target.catalog_id.upper(), []).append(target)
+        self._catalog_ras = tuple(target.ra for target in self.catalog)
+        self._catalog_decs = tuple(target.dec for target in self.catalog)
+
     def _load_catalog(self) -> List[CelestialTarget]:
         """Load objects catalog from JSON"""
         if not self.catalog_path.exists():
@@ -80,9 +104,11 @@ class TargetSelector:
         # Filter and score targets
         scored_targets = []
 
-        for target in self.catalog:
+        # Visibility of the whole catalog in one transform
+        visibilities = self._check_catalog_visibility(location, ephemeris)
+
+        for target, visibility in zip(self.catalog, visibilities):
             # Check visibility
-            visibility = self._check_visibility(target, location, ephemeris, date)
 
             if not visibility['is_visible']:
                 continue
@@ -177,7 +203,7 @@ class TargetSelector:
 
         # Filter recommendations based on moon
         if ephemeris.moon_illumination > 70:
-            if any(f in target.optimal_filters for f in ["H-alpha", "OIII", "SII"]):
+            if not NARROWBAND_FILTERS.isdisjoint(target.optimal_filters):
                 recommendations.append(f"✓ Banda estrecha recomendada (Luna {ephemeris.moon_illumination}%)")
             else:
                 recommendations.append(f"⚠️ Luna brillante ({ephemeris.moon_illumination}%). Mejor banda estrecha.")
@@ -224,25 +250,15 @@ class TargetSelector:
     def search_by_name(self, query: str) -> List[CelestialTarget]:
         """Search targets by name or catalog ID"""
         query_lower = query.lower()
-        matches = []
 
-        for target in self.catalog:
-            if (query_lower in target.name.lower() or
-                query_lower in target.catalog_id.lower()):
-                matches.append(target)
-
-        return matches
+        return [
+            target for name, catalog_id, target in self._search_keys
+            if query_lower in name or query_lower in catalog_id
+        ]
 
     def search_by_catalog_id(self, catalog_id: str) -> List[CelestialTarget]:
         """Search targets by exact catalog ID match"""
-        catalog_id_upper = catalog_id.upper()
-        matches = []
-
-        for target in self.catalog:
-            if target.catalog_id.upper() == catalog_id_upper:
-                matches.append(target)
-
-        return matches
+        return list(self._by_catalog_id.get(catalog_id.upper(), ()))
 
     def _calculate_fov(self, sensor_pixels: float, pixel_size_um: float, focal_length_mm: float) -> float:
         """Calculate field of view in arcminutes"""
@@ -259,42 +275,31 @@ class TargetSelector:
         date: datetime
     ) -> dict:
         """Check if target is visible during the night"""
-        observer = EarthLocation(
-            lat=location.latitude * u.deg,
-            lon=location.longitude * u.deg,
-            height=(location.elevation or 0) * u.m
-        )
-
-        coord = SkyCoord(ra=target.ra * u.deg, dec=target.dec * u.deg, frame='icrs')
-
-        # Sample times during darkness
-        start = Time(ephemeris.darkness_start)
-        end = Time(ephemeris.darkness_end)
-        n_samples = 50
-        times = start + np.linspace(0, (end - start).to(u.hour).value, n_samples) * u.hour
-
-        # Calculate altitudes
-        altaz = coord.transform_to(AltAz(obstime=times, location=observer))
-        max_alt = np.max(altaz.alt.deg)
-        max_alt_idx = np.argmax(altaz.alt.deg)
-        max_alt_time = times[max_alt_idx].datetime
-
-        # Check good observing time (alt > 30°)
-        good_alt = altaz.alt.deg > 30
-        optimal_hours = np.sum(good_alt) / n_samples * ephemeris.darkness_duration
-
-        # Scoring
-        altitude_score = min(max_alt / 70, 1.0)  # Best at 70° or higher
-        duration_score = min(optimal_hours / 4, 1.0)  # Best if >4h available
-
-        return {
-            'is_visible': max_alt > 30,
-            'max_altitude': float(max_alt),
-            'max_altitude_time': max_alt_time,
-            'optimal_hours': float(optimal_hours),
-            'altitude_score': altitude_score,
-            'duration_score': duration_score
-        }
+        # Copy so callers can't modify the cached result
+        return dict(_night_visibility(
+            target.ra,
+            target.dec,
+            location.latitude,
+            location.longitude,
+            location.elevation or 0,
+            ephemeris.darkness_start,
+            ephemeris.darkness_end,
+            ephemeris.darkness_duration
+        ))
+
+    def _check_catalog_visibility(self, location: GeoLocation, ephemeris: Ephemeris) -> List[dict]:
+        """Visibility of every catalog target during the night, in catalog order"""
+        # Copy so callers can't modify the cached results
+        return [dict(visibility) for visibility in _catalog_visibility(
+            self._catalog_ras,
+            self._catalog_decs,
+            location.latitude,
+            location.longitude,
+            location.elevation or 0,
+            ephemeris.darkness_start,
+            ephemeris.darkness_end,
+            ephemeris.darkness_duration
+        )]
 
     def _score_size_fit(self, target_size: float, fov_width: float, fov_height: float) -> float:
         """Score how well target size fits in FOV (0-1)"""
@@ -316,8 +321,8 @@ class TargetSelector:
 
     def _score_filters(self, filters: List[str], moon_illumination: int) -> float:
         """Score filter suitability based on moon phase"""
-        has_narrowband = any(f in filters for f in ["H-alpha", "OIII", "SII"])
-        has_broadband = any(f in filters for f in ["L", "R", "G", "B"])
+        has_narrowband = not NARROWBAND_FILTERS.isdisjoint(filters)
+        has_broadband = not BROADBAND_FILTERS.isdisjoint(filters)
 
         if moon_illumination > 70:
             # Bright moon: prefer narrowband
@@ -328,3 +333,103 @@ class TargetSelector:
         else:
             # Dark moon: prefer broadband
             return 0.8 if has_broadband else 0.9
+
+
+@lru_cache(maxsize=VISIBILITY_CACHE_SIZE)
+def _night_visibility(
+    ra: float,
+    dec: float,
+    latitude: float,
+    longitude: float,
+    elevation: float,
+    darkness_start: datetime,
+    darkness_end: datetime,
+    darkness_duration: float
+) -> dict:
+    """
+    Altitude-based visibility of a position during a night's darkness
+
+    Memoized: the AltAz transform dominates target suggestion, and the same
+    targets are checked again by repeated suggestions and by selecting one
+    of them for the same night and location.
+    """
+    return _visibilities(
+        (ra,), (dec,), latitude, longitude, elevation,
+        darkness_start, darkness_end, darkness_duration
+    )[0]
+
+
+@lru_cache(maxsize=CATALOG_VISIBILITY_CACHE_SIZE)
+def _catalog_visibility(
+    ras: Tuple[float, ...],
+    decs: Tuple[float, ...],
+    latitude: float,
+    longitude: float,
+    elevation: float,
+    darkness_start: datetime,
+    darkness_end: datetime,
+    darkness_duration: float
+) -> Tuple[dict, ...]:
+    """_night_visibility for many positions, memoized per night and location"""
+    return _visibilities(
+        ras, decs, latitude, longitude, elevation,
+        darkness_start, darkness_end, darkness_duration
+    )
+
+
+def _visibilities(
+    ras: Tuple[float, ...],
+    decs: Tuple[float, ...],
+    latitude: float,
+    longitude: float,
+    elevation: float,
+    darkness_start: datetime,
+    darkness_end: datetime,
+    darkness_duration: float
+) -> Tuple[dict, ...]:
+    # Sample times during darkness, shared by every position
+    times, frame = build_altaz_grid(
+        latitude, longitude, elevation, darkness_start, darkness_end, VISIBILITY_SAMPLES
+    )
+
+    # Calculate altitudes: (positions, samples) in one transform
+    coords = SkyCoord(
+        ra=np.array(ras)[:, np.newaxis] * u.deg,
+        dec=np.array(decs)[:, np.newaxis] * u.deg,
+        frame='icrs'
+    )
+    altitudes = coords.transform_to(frame).alt.deg
+
+    results = []
+    for alt in altitudes:
+        max_alt = np.max(alt)
+        max_alt_idx = np.argmax(alt)
+        max_alt_time = times[max_alt_idx].datetime
+
+        # Check good observing time (alt > 30°)
+        good_alt = alt > 30
+        optimal_hours = np.sum(good_alt) / VISIBILITY_SAMPLES * darkness_duration
+
+        # Scoring
+        altitude_score = min(max_alt / 70, 1.0)  # Best at 70° or higher
+        duration_score = min(optimal_hours / 4, 1.0)  # Best if >4h available
+
+        results.append({
+            'is_visible': max_alt > 30,
+            'max_altitude': float(max_alt),
+            'max_altitude_time': max_alt_time,
+            'optimal_hours': float(optimal_hours),
+            'altitude_score': altitude_score,
+            'duration_score': duration_score
+        })
+    return tuple(results)
+
+
+@lru_cache(maxsize=1)
+def get_target_selector() -> TargetSelector:
+    """
+    Get the process-wide TargetSelector
+
+    The objects catalog is loaded on first use instead of at router import.
+    """
+    return TargetSelector()
@@ -3,8 +3,12 @@ Utility functions for Astroalex backend
 """
 from .directory import DirectoryManager
 from .metadata_parser import MetadataParser
+from .responses import get_type_adapter, json_response, file_etag
 
 __all__ = [
     "DirectoryManager",
     "MetadataParser",
+    "get_type_adapter",
+    "json_response",
+    "file_etag",
 ]
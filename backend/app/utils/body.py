@@ -0,0 +1,57 @@
+"""
+Request body parsing straight from raw JSON bytes
+"""
+from typing import Any
+
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from .responses import get_type_adapter
+
+
+async def validate_body(request: Request, annotation: Any) -> Any:
+    """
+    Validate a JSON request body against a type
+
+    pydantic-core parses and validates the raw bytes in one pass instead of
+    FastAPI's json.loads -> dict -> model path. Errors are reported as the
+    usual 422 response.
+
+    Args:
+        request: Incoming request
+        annotation: Expected body type (model class or e.g. dict)
+
+    Returns:
+        Validated body
+    """
+    body = await request.body()
+    try:
+        return get_type_adapter(annotation).validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors()]
+        )
+
+
+def body_schema(annotation: Any) -> dict:
+    """
+    OpenAPI request body for routes that read the raw body themselves
+
+    Nested models are referenced from components/schemas, so they must also
+    appear in some response_model (as they do for the equipment profiles).
+
+    Args:
+        annotation: Body type (model class or e.g. dict)
+
+    Returns:
+        Value for the route's openapi_extra
+    """
+    schema = get_type_adapter(annotation).json_schema(ref_template="#/components/schemas/{model}")
+    schema.pop("$defs", None)
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": schema}},
+        }
+    }
@@ -0,0 +1,41 @@
+"""
+Shared HTTP client for outbound API calls
+"""
+import threading
+from typing import Optional
+
+import httpx
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Get the process-wide HTTP client, creating it on first use
+
+    Connections are kept alive and reused, so repeated calls to the same API
+    skip the TCP and TLS handshakes. The client is thread-safe and shared by
+    the threadpool handlers.
+    """
+    global _client
+    client = _client
+    if client is None:
+        # Threadpool workers can race here; only one of them builds the client
+        with _client_lock:
+            client = _client
+            if client is None:
+                client = _client = httpx.Client(
+                    timeout=httpx.Timeout(10.0),
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                )
+    return client
+
+
+def close_http_client() -> None:
+    """Close the client's pooled connections, if it was ever created"""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
@@ -0,0 +1,136 @@
+"""
+NaN- and mask-aware reductions over frame stacks
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+from astropy.stats import sigma_clipped_stats
+
+# Scales a median absolute deviation to a Gaussian standard deviation
+MAD_TO_SIGMA = 1.482602218505602
+
+# Widest value range (max - min) clipped_stats will histogram
+HISTOGRAM_MAX_BINS = 1 << 20
+
+# Elements binned at a time, bounding the int/float temporaries
+HISTOGRAM_BLOCK = 1 << 20
+
+
+def _as_nan_filled(data) -> np.ndarray:
+    """Float array with masked entries replaced by NaN"""
+    if np.ma.isMaskedArray(data):
+        # One pass instead of astype() followed by filled()
+        return np.where(np.ma.getmaskarray(data), np.nan, np.asarray(data.data, dtype=float))
+    return np.asarray(data, dtype=float)
+
+
+def nanmedian(data, axis: int = 0) -> np.ndarray:
+    """
+    Median along an axis ignoring NaN and masked entries
+
+    Gives the same result as numpy.nanmedian. For the short axes of frame
+    stacks (fewer than 600 frames) numpy falls back to masked arrays; this
+    sorts once and picks the middle of the valid values instead, which is
+    several times faster.
+
+    Args:
+        data: Stack (ndarray or MaskedArray), frames along `axis`
+        axis: Axis to reduce
+
+    Returns:
+        Median array; NaN where every value was NaN or masked
+    """
+    data = _as_nan_filled(data)
+    ordered = np.sort(data, axis=axis)  # NaNs sort last
+    count = np.sum(~np.isnan(data), axis=axis, keepdims=True)
+    low = np.take_along_axis(ordered, np.maximum(count - 1, 0) // 2, axis=axis)
+    high = np.take_along_axis(ordered, np.minimum(count // 2, data.shape[axis] - 1), axis=axis)
+    median = np.where(count > 0, (low + high) / 2, np.nan)
+    return np.squeeze(median, axis=axis)
+
+
+def nan_sigma(data, axis: int = 0) -> np.ndarray:
+    """
+    Standard deviation estimated from the median absolute deviation
+
+    Same as ccdproc's sigma_func with ignore_nan=True, using nanmedian.
+    """
+    data = _as_nan_filled(data)
+    median = np.expand_dims(nanmedian(data, axis=axis), axis=axis)
+    deviation = np.subtract(data, median)
+    np.abs(deviation, out=deviation)
+    return nanmedian(deviation, axis=axis) * MAD_TO_SIGMA
+
+
+def clipped_stats(data, sigma: float = 3.0, maxiters: int = 5) -> Tuple[float, float, float]:
+    """
+    Sigma-clipped mean, median and standard deviation of a whole frame
+
+    Clips like astropy's sigma_clipped_stats with its defaults (median
+    center, population std, stop once nothing changes). Frames holding only
+    integer values, as raw sensor frames do, are clipped on a histogram of
+    their values: one pass over the pixels, then every iteration works on
+    the bins, instead of partitioning the frame each time. Anything else is
+    passed to astropy.
+
+    Args:
+        data: Frame of any shape
+        sigma: Clipping threshold in standard deviations, both sides
+        maxiters: Maximum clipping iterations
+
+    Returns:
+        (mean, median, std) of the values left after clipping
+    """
+    histogram = _integer_histogram(np.asarray(data))
+    if histogram is None:
+        mean, median, std = sigma_clipped_stats(data, sigma=sigma, maxiters=maxiters)
+        return float(mean), float(median), float(std)
+
+    counts, first = histogram
+    values = np.arange(first, first + counts.size, dtype=float)
+    lo, hi = 0, counts.size
+    for _ in range(maxiters):
+        mean, median, std = _histogram_stats(counts[lo:hi], values[lo:hi])
+        new_lo = np.searchsorted(values, median - sigma * std, side="left")
+        new_hi = np.searchsorted(values, median + sigma * std, side="right")
+        if counts[new_lo:new_hi].sum() == counts[lo:hi].sum():
+            break
+        lo, hi = new_lo, new_hi
+
+    return _histogram_stats(counts[lo:hi], values[lo:hi])
+
+
+def _integer_histogram(data: np.ndarray) -> Optional[Tuple[np.ndarray, int]]:
+    """Counts per integer value and the first value, or None for other data"""
+    if data.dtype.kind not in "iuf" or data.size == 0:
+        return None
+    flat = data.ravel()
+    low, high = flat.min().item(), flat.max().item()  # NaN propagates and fails below
+    if not (np.isfinite(low) and np.isfinite(high)):
+        return None
+    if low != np.floor(low) or high - low >= HISTOGRAM_MAX_BINS or max(-low, high) >= 1 << 24:
+        return None
+
+    low = int(low)
+    exact = data.dtype.kind in "iu"
+    counts = np.zeros(int(high) - low + 1, dtype=np.int64)
+    for start in range(0, flat.size, HISTOGRAM_BLOCK):
+        block = flat[start:start + HISTOGRAM_BLOCK]
+        bins = block.astype(np.intp)
+        if not exact and not np.array_equal(bins, block):
+            return None
+        bins -= low
+        counts += np.bincount(bins, minlength=counts.size)
+    return counts, low
+
+
+def _histogram_stats(counts: np.ndarray, values: np.ndarray) -> Tuple[float, float, float]:
+    """Mean, median and population std of the values a histogram counts"""
+    total = counts.sum()
+    mean = counts @ values / total
+    std = np.sqrt(counts @ (values - mean) ** 2 / total)
+
+    cumulative = np.cumsum(counts)
+    low = values[np.searchsorted(cumulative, (total - 1) // 2, side="right")]
+    high = values[np.searchsorted(cumulative, total // 2, side="right")]
+    return float(mean), float((low + high) / 2), float(std)
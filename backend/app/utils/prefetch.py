@@ -0,0 +1,52 @@
+"""
+Kernel read-ahead for frames a batch loop is about to open
+"""
+import os
+from typing import Iterator, Sequence
+
+# Frames requested ahead of the one being processed
+PREFETCH_DEPTH = 2
+
+
+def readahead(path: str) -> None:
+    """
+    Ask the kernel to start loading a file into the page cache
+
+    Returns immediately; the read happens in the background. A no-op where
+    posix_fadvise is unavailable or the file can't be opened (the caller's
+    own open will report that).
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def iter_prefetched(paths: Sequence[str], depth: int = PREFETCH_DEPTH) -> Iterator[str]:
+    """
+    Yield paths in order while keeping the next `depth` files loading
+
+    Overlaps the disk reads of upcoming frames with the processing of the
+    current one.
+
+    Args:
+        paths: Files in processing order
+        depth: How many files ahead to prefetch
+
+    Yields:
+        Each path, in order
+    """
+    for path in paths[:depth]:
+        readahead(path)
+    for i, path in enumerate(paths):
+        if i + depth < len(paths):
+            readahead(paths[i + depth])
+        yield path
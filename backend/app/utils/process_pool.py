@@ -0,0 +1,53 @@
+"""
+Shared process pool for CPU-bound work triggered from request handlers
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Get the process-wide pool, starting it on first use
+
+    Workers are started with forkserver where available, so they don't
+    inherit the server's sockets and threads.
+    """
+    global _pool
+    if _pool is None:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+        else:
+            context = multiprocessing.get_context()
+        _pool = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=context)
+    return _pool
+
+
+async def run_in_process(func: Callable[..., Any], *args) -> Any:
+    """
+    Run a picklable callable in the process pool without blocking the event loop
+
+    Unlike asyncio.to_thread, concurrent calls run on separate cores
+    instead of contending for the GIL.
+
+    Args:
+        func: Module-level function or method of a picklable object
+        *args: Picklable arguments
+
+    Returns:
+        The callable's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), func, *args)
+
+
+def shutdown_process_pool() -> None:
+    """Stop the pool's workers, if it was ever started"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
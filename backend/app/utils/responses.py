@@ -0,0 +1,73 @@
+"""
+Pre-serialized JSON responses for hot list endpoints
+"""
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def get_type_adapter(annotation: Any) -> TypeAdapter:
+    """
+    Get the shared TypeAdapter for a type annotation
+
+    Building an adapter walks the whole core schema, so it is done once per
+    annotation and reused by every router.
+    """
+    return TypeAdapter(annotation)
+
+
+def json_response(
+    annotation: Any,
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Serialize already validated models straight to a JSON response
+
+    Returning a Response skips FastAPI's response_model round trip (dump to
+    dicts, re-validate, encode); the route's response_model is still used
+    for the OpenAPI schema.
+
+    Args:
+        annotation: Type of the content (e.g. List[MasterCalibration])
+        content: Value to serialize
+        status_code: HTTP status code
+        headers: Extra response headers (e.g. ETag)
+
+    Returns:
+        JSON response rendered by pydantic-core
+    """
+    return Response(
+        content=get_type_adapter(annotation).dump_json(content),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json"
+    )
+
+
+def file_etag(path: Path) -> str:
+    """
+    ETag for data backed by a single metadata file
+
+    Derived from the file's mtime and size, so it changes on every write
+    without reading or hashing the contents.
+    """
+    stat = path.stat()
+    digest = hashlib.blake2b(f"{stat.st_mtime_ns}:{stat.st_size}".encode(), digest_size=8)
+    return f'"{digest.hexdigest()}"'
+
+
+def value_etag(*parts: Any) -> str:
+    """
+    ETag for a resource identified by values that change on every write
+
+    e.g. value_etag(project.id, project.updated_at)
+    """
+    digest = hashlib.blake2b(":".join(map(str, parts)).encode(), digest_size=8)
+    return f'"{digest.hexdigest()}"'
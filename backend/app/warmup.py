@@ -0,0 +1,83 @@
+"""
+Startup warm-up of pydantic validators and serializers
+"""
+import logging
+import time
+from typing import List
+
+from app.models.config import AppConfig, UserState, StorageConfig
+from app.models.equipment import EquipmentProfile, EquipmentCreate
+from app.models.metadata import CalibrationSession, MasterCalibration, FileMetadata
+from app.models.pipeline import ProcessingPipeline
+from app.models.project import Project
+from app.models.session import (
+    SkyConditions,
+    Ephemeris,
+    SensorProfile,
+    CelestialTarget,
+    FOVSimulation,
+    ScoutAnalysis,
+    PlanItem,
+    AcquisitionPlan,
+    SessionListItem,
+    AssistantMessage,
+    ObservingSession,
+)
+from app.routers.calibration import MasterCreate
+from app.utils.responses import get_type_adapter
+
+logger = logging.getLogger(__name__)
+
+# Models declared with defer_build=True
+DEFERRED_MODELS = (
+    SkyConditions,
+    Ephemeris,
+    SensorProfile,
+    CelestialTarget,
+    FOVSimulation,
+    ScoutAnalysis,
+    PlanItem,
+    AcquisitionPlan,
+    SessionListItem,
+    AssistantMessage,
+)
+
+# Types served through json_response / parsed through validate_body
+ADAPTER_TYPES = (
+    List[CalibrationSession],
+    CalibrationSession,
+    List[MasterCalibration],
+    MasterCalibration,
+    MasterCreate,
+    List[EquipmentProfile],
+    EquipmentProfile,
+    EquipmentCreate,
+    AppConfig,
+    UserState,
+    StorageConfig,
+    List[FileMetadata],
+    ObservingSession,
+    List[SessionListItem],
+    List[Project],
+    Project,
+    List[ProcessingPipeline],
+    dict,
+)
+
+
+def warmup_validators() -> None:
+    """
+    Build deferred model schemas and the shared TypeAdapters up front
+
+    Moves the one-off core-schema construction cost from the first request
+    on each route to application startup.
+    """
+    start = time.perf_counter()
+
+    for model in DEFERRED_MODELS:
+        model.model_rebuild()
+
+    for annotation in ADAPTER_TYPES:
+        get_type_adapter(annotation)
+
+    logger.info(f"Warmed up pydantic validators in {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,22 @@
+"""
+Tests for calibration frame combination helpers
+"""
+import numpy as np
+
+from app.services.calibration.combiner import _RunningStats
+
+
+def test_running_stats_samples_do_not_hold_blocks():
+    """Test stored median samples own their data and match whole-frame stats"""
+    rng = np.random.default_rng(0)
+    frame = rng.normal(1000.0, 10.0, (40, 300))
+
+    stats = _RunningStats(frame.size)
+    for block in np.array_split(frame, 4):
+        stats.add(block.copy())
+
+    assert all(sample.base is None for sample in stats.samples)
+    result = stats.result()
+    assert np.isclose(result["mean"], frame.mean())
+    assert np.isclose(result["std"], frame.std())
+    assert result["min"] == frame.min() and result["max"] == frame.max()
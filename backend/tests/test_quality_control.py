@@ -0,0 +1,72 @@
+"""
+Tests for ML quality control
+"""
+import pytest
+import numpy as np
+
+pytest.importorskip("sklearn")
+pytest.importorskip("sep")
+
+from app.ml.quality_control import QualityControl, FEATURE_DTYPE, REJECTION_REASONS
+
+
+def make_features(rows):
+    """Helper to build a structured features array"""
+    return np.array(rows, dtype=FEATURE_DTYPE)
+
+
+@pytest.fixture
+def session_features():
+    """Ten nominal frames plus one of each rejection type"""
+    nominal = [(3.0, 0.1, 1000.0, 200, 10.0)] * 10
+    anomalies = [
+        (6.0, 0.1, 1000.0, 200, 10.0),   # high FWHM
+        (3.0, 0.5, 1000.0, 200, 10.0),   # elongated stars
+        (3.0, 0.1, 2000.0, 200, 10.0),   # high background
+        (3.0, 0.1, 1000.0, 50, 10.0),    # low star count
+        (3.2, 0.2, 1100.0, 180, 30.0),   # none of the above
+    ]
+    return make_features(nominal + anomalies)
+
+
+def test_categorize_rejections(session_features):
+    """Test each rejected frame gets its primary reason"""
+    qc = QualityControl(cache_dir=None)
+    codes = qc._categorize_rejections(session_features, np.arange(10, 15))
+
+    assert [REJECTION_REASONS[code] for code in codes] == list(REJECTION_REASONS)
+
+
+def test_categorize_rejections_empty(session_features):
+    """Test no rejections yields no reasons"""
+    qc = QualityControl(cache_dir=None)
+    assert len(qc._categorize_rejections(session_features, np.array([], dtype=int))) == 0
+
+
+def test_calculate_statistics(session_features):
+    """Test statistics are computed over accepted frames only"""
+    qc = QualityControl(cache_dir=None)
+    stats = qc._calculate_statistics(session_features, np.arange(10))
+
+    assert stats['fwhm']['median'] == pytest.approx(3.0)
+    assert stats['fwhm']['std'] == pytest.approx(0.0)
+    assert stats['background']['median'] == pytest.approx(1000.0)
+    assert stats['star_count']['median'] == pytest.approx(200)
+
+
+def test_get_rejected(session_features):
+    """Test rejected entries are expanded from indices and reason codes"""
+    report = {
+        'frame_paths': [f"frame_{i:03d}.fits" for i in range(len(session_features))],
+        'features': session_features,
+        'rejected_frames': [(10, 0), (13, 3)],
+    }
+
+    rejected = list(QualityControl.get_rejected(report))
+
+    assert rejected[0]['path'] == "frame_010.fits"
+    assert rejected[0]['reason'] == REJECTION_REASONS[0]
+    assert rejected[0]['features']['fwhm'] == pytest.approx(6.0)
+    assert rejected[1]['features']['star_count'] == 50
+
+    assert len(list(QualityControl.get_rejected(report, start=1))) == 1